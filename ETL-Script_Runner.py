@@ -1,81 +1,474 @@
 import pandas as pd
+import sys
+import time
 import traceback
 from datetime import datetime
 
 from etl_modules import (
     # Utils
-    load_env_variables, create_robust_engine, execute_with_retry,
-    
+    load_env_variables, load_etl_settings, create_robust_engine, execute_with_retry,
+
     # Extract
-    extract_source_tables, get_last_etl_run,
-    
+    extract_source_tables, extract_tables, extract_source_range,
+    stream_order_items, get_last_etl_run, probe_source_tables,
+
     # Transform
-    transform_product_dimension, transform_user_dimension, 
-    transform_rider_dimension, transform_date_dimension,
+    transform_product_dimension, transform_user_dimension,
+    transform_rider_dimension, parse_delivery_dates,
     transform_fact_table,
-    
+
     # Load
-    load_dimension_table, load_date_dimension, 
-    load_fact_table, record_etl_run
+    load_dimension_table, ensure_calendar,
+    load_fact_table, load_fact_chunks, load_fact_parallel, widen_fact_id, record_etl_run,
+
+    # Partitioning and indexes
+    partition_fact_table, is_partitioned,
+    drop_managed_indexes, ensure_managed_indexes, analyze_tables,
+
+    # Aggregates
+    ensure_aggregate_tables, refresh_aggregates,
+
+    # Stage scheduling
+    run_stages, SkipRemaining,
+
+    # Watermarks
+    ensure_watermark_table, get_watermarks, incremental_since, table_since,
+    changed_tables, unchanged_reads, apply_probe, observe_watermarks, record_watermarks,
+
+    # Staging
+    STAGED_TABLES, write_staging_snapshot, find_staging_snapshot, read_staging_snapshot,
+
+    # Dates and normalization dictionaries
+    load_date_cache, save_date_cache, load_normalization_maps, save_normalization_maps,
+    new_calendar_range, load_calendar_range, save_calendar_range
 )
 
+def get_run_date(supabase_engine):
+    """Return the last ETL run timestamp, or None when a full load is needed.
+
+    Only an empty etl_runs means a full load. Any error reading it fails the
+    run instead, so a short warehouse outage never turns a daemon cycle into
+    a full reload.
+    """
+    etl_runs = execute_with_retry(supabase_engine, get_last_etl_run)
+
+    if len(etl_runs) > 0:
+        run_date = pd.to_datetime(etl_runs.iloc[0]['run_date'], utc=True)
+        print(f"Last ETL run was at: {run_date}")
+        return run_date
+    print("No previous ETL runs found. Performing full load.")
+    return None
+
+# Dimension tables and their keys, in load order
+DIMENSION_TABLES = [('dim_product', 'product_id'), ('dim_user', 'user_id'), ('dim_rider', 'rider_id')]
+
+# Source tables each warehouse table is built from (their watermarks decide which rows changed)
+WAREHOUSE_SOURCES = {
+    'dim_product': ['Products'],
+    'dim_user': ['Users'],
+    'dim_rider': ['Riders', 'Couriers'],
+    'fact_orders': ['Orders', 'OrderItems'],
+}
+
+def load_method_for(settings, table_name):
+    """'copy' for tables listed in ETL_COPY_TABLES, 'insert' otherwise"""
+    return 'copy' if table_name in settings['copy_tables'] else 'insert'
+
+def load_dimension(supabase_engine, rows, table_name, id_column, since, settings):
+    """Load one dimension table with its configured load method and write mode
+
+    since holds the per-table source watermarks (None = full load). Returns
+    {table_name} when the table was written to, else an empty set.
+    """
+    loaded = load_dimension_table(
+        supabase_engine, rows, table_name, id_column, table_since(since, WAREHOUSE_SOURCES[table_name]),
+        load_method_for(settings, table_name), settings['write_mode']
+    )
+    return {table_name} if loaded > 0 else set()
+
+def load_dimensions(supabase_engine, dims, since, settings):
+    """Load every dimension table with its configured load method and write mode
+
+    Returns the names of the tables that were written to.
+    """
+    touched = set()
+    for table_name, id_column in DIMENSION_TABLES:
+        touched |= load_dimension(supabase_engine, dims[table_name], table_name, id_column, since, settings)
+    return touched
+
+def extend_calendar(supabase_engine, parsed_delivery_dates, calendar, settings):
+    """Make dim_date cover the configured range and the given delivery dates"""
+    return ensure_calendar(
+        supabase_engine, parsed_delivery_dates, calendar,
+        settings['calendar_start'], settings['calendar_end'], load_method_for(settings, 'dim_date')
+    )
+
+def stream_fact_chunks(mysql_engine, supabase_engine, products_df, chunksize, settings, since=None,
+                       date_cache=None, calendar=None, touched=None, watermarks=None):
+    """Yield transformed fact chunks, extending dim_date for each chunk's dates along the way"""
+    for order_items_chunk in stream_order_items(mysql_engine, chunksize, since=since):
+        orders_chunk = extract_source_range(
+            mysql_engine, 'Orders',
+            order_items_chunk['OrderId'].min(), order_items_chunk['OrderId'].max(),
+            since=since
+        )
+        if watermarks is not None:
+            observe_watermarks(watermarks, 'OrderItems', order_items_chunk)
+            observe_watermarks(watermarks, 'Orders', orders_chunk)
+        parsed_delivery_dates = parse_delivery_dates(orders_chunk, date_cache)
+        if extend_calendar(supabase_engine, parsed_delivery_dates, calendar, settings) > 0 and touched is not None:
+            touched.add('dim_date')
+
+        yield transform_fact_table(order_items_chunk, orders_chunk, products_df, parsed_delivery_dates)
+
+def extract_or_restage(mysql_engine, run_date, since, current_run_timestamp, settings, skip=None):
+    """Extract source tables, or reuse a Parquet snapshot taken from the same run date.
+
+    Returns the frames and the extraction timestamp to record for this run; a
+    reused snapshot keeps its original timestamp so no source change is skipped.
+    """
+    staging_dir = settings['staging_dir']
+    if staging_dir and settings['staging_reuse']:
+        snapshot = find_staging_snapshot(staging_dir, run_date)
+        if snapshot is not None:
+            frames, extracted_at = read_staging_snapshot(snapshot)
+            return tuple(frames[name] for name in STAGED_TABLES), extracted_at
+        print("No staged snapshot for this watermark; extracting from source.")
+
+    extracted = extract_source_tables(
+        mysql_engine, since=since, max_workers=settings['extract_workers'],
+        partitions=settings['extract_partitions'], skip=skip
+    )
+    if staging_dir:
+        write_staging_snapshot(staging_dir, dict(zip(STAGED_TABLES, extracted)), run_date, current_run_timestamp)
+    return extracted, current_run_timestamp
+
+def large_fact_load(run_date, fact_rows, settings):
+    """True when a fact load is big enough to rebuild secondary indexes instead of maintaining them"""
+    return run_date is None or (fact_rows is not None and fact_rows >= settings['index_rebuild_rows'])
+
+def load_facts(supabase_engine, load, large):
+    """Run a fact load, dropping the secondary indexes first when it is large.
+
+    The indexes are rebuilt afterwards even if the load fails. A partitioned
+    fact_orders keeps them: full reloads build swap tables with the parent's
+    indexes while dashboards keep reading the indexed live partitions.
+    """
+    if large:
+        with supabase_engine.connect() as conn:
+            partitioned = is_partitioned(conn)
+        if partitioned:
+            # Swap tables copy the parent's index list, so it must be complete first
+            ensure_managed_indexes(supabase_engine, ['fact_orders'])
+            large = False
+    if large:
+        drop_managed_indexes(supabase_engine, ['fact_orders'])
+    try:
+        return load()
+    finally:
+        if large:
+            ensure_managed_indexes(supabase_engine, ['fact_orders'])
+
+def run_streaming(mysql_engine, supabase_engine, since, settings, date_cache=None, norm_maps=None, calendar=None,
+                  watermarks=None, skip=None):
+    """Run the ETL with bounded memory: dimensions whole, OrderItems in chunks
+
+    since holds the per-table source watermarks (None = full load); the
+    newest rows seen are observed into watermarks and source tables in skip
+    aren't read. Returns the names of the warehouse tables that were written to.
+    """
+    chunksize = settings['stream_chunksize']
+    skip = set(skip or ())
+    frames = extract_tables(
+        mysql_engine, ['Products', 'Users', 'Riders', 'Couriers'],
+        since=since, max_workers=settings['extract_workers'], skip=skip
+    )
+    if watermarks is not None:
+        for name, df in frames.items():
+            observe_watermarks(watermarks, name, df)
+    products_df, users_df = frames['Products'], frames['Users']
+    riders_df, couriers_df = frames['Riders'], frames['Couriers']
+
+    touched = load_dimensions(supabase_engine, {
+        'dim_product': transform_product_dimension(products_df, norm_maps),
+        'dim_user': transform_user_dimension(users_df, date_cache, norm_maps),
+        'dim_rider': transform_rider_dimension(riders_df, couriers_df),
+    }, since, settings)
+
+    if 'OrderItems' in skip:
+        print("Skipped OrderItems (unchanged)")
+        return touched
+    fact_chunks = stream_fact_chunks(
+        mysql_engine, supabase_engine, products_df, chunksize, settings, since, date_cache, calendar, touched, watermarks
+    )
+    loaded = load_facts(supabase_engine, lambda: load_fact_chunks(
+        supabase_engine, fact_chunks, table_since(since, WAREHOUSE_SOURCES['fact_orders']),
+        load_method_for(settings, 'fact_orders'), settings['write_mode']
+    ), large_fact_load(since, None, settings))
+    if loaded > 0:
+        touched.add('fact_orders')
+    return touched
+
+def prepare_warehouse(supabase_engine, settings):
+    """Warehouse-side setup every run needs before loading"""
+    # fact_id = order_id << 32 | product_id needs a bigint column; a no-op once it is one
+    widen_fact_id(supabase_engine)
+    if settings['partition_facts']:
+        # One-time conversion; a no-op once fact_orders is partitioned
+        partition_fact_table(supabase_engine)
+    ensure_aggregate_tables(supabase_engine)
+    ensure_watermark_table(supabase_engine)
+
+def probe_changes(mysql_engine, watermarks, run_date):
+    """Compare each source table's COUNT/MAX(updatedAt)/MAX(key) with its watermark.
+
+    Returns the source tables an incremental run can skip reading and
+    raises SkipRemaining when nothing changed. A full load reads everything
+    but still records the probe for the next run.
+    """
+    probed = probe_source_tables(mysql_engine)
+    changed = set(probed) if run_date is None else changed_tables(probed, watermarks)
+    apply_probe(watermarks, probed)
+    if not changed:
+        raise SkipRemaining("no source table changed since the last run")
+    skip = unchanged_reads(changed)
+    if skip:
+        print(f"Changed source tables: {', '.join(sorted(changed))}; not reading {', '.join(sorted(skip))}")
+    return skip
+
+def new_run_state(settings):
+    """Connections and caches an ETL run starts from; the daemon keeps one across cycles"""
+    return {
+        'mysql_engine': None,
+        'supabase_engine': None,
+        # Warehouse setup (partitioning, aggregate tables) already done
+        'prepared': False,
+        # Raw date string -> parsed date, shared by every transform (and across runs if persisted)
+        'date_cache': load_date_cache(settings['date_cache_path']),
+        # Raw category/gender/place -> canonical value, likewise shared and optionally persisted
+        'norm_maps': load_normalization_maps(settings['normalization_cache_path']),
+        # date_id range dim_date covers, as of the last cycle
+        'calendar': None,
+    }
+
+def etl_stages(mysql_conn_str, supabase_conn_str, settings, state, started_at):
+    """One ETL run as {stage: (func, dependencies)} for run_stages.
+
+    Each func receives a dict of its dependencies' results. The three
+    dimensions are transformed and loaded independently of each other and
+    of the fact transform; facts are loaded once every dimension and the
+    calendar are in place. Connections and caches in state are reused.
+    """
+    date_cache, norm_maps = state['date_cache'], state['norm_maps']
+
+    # Connections and warehouse setup go into state as soon as they succeed,
+    # so a cycle failing in a later stage doesn't open or prepare them again
+    def connect_mysql(r):
+        if state['mysql_engine'] is None:
+            state['mysql_engine'] = create_robust_engine(mysql_conn_str)
+        return state['mysql_engine']
+
+    def connect_supabase(r):
+        if state['supabase_engine'] is None:
+            state['supabase_engine'] = create_robust_engine(supabase_conn_str, retries=5, delay=10)
+        return state['supabase_engine']
+
+    def prepare(r):
+        if not state['prepared']:
+            prepare_warehouse(r['connect_supabase'], settings)
+            state['prepared'] = True
+
+    stages = {
+        # 1. Initialize connections
+        'connect_mysql': (connect_mysql, []),
+        'connect_supabase': (connect_supabase, []),
+        'prepare_warehouse': (prepare, ['connect_supabase']),
+        # 2. Get last ETL run time for incremental loading
+        'run_date': (lambda r: get_run_date(r['connect_supabase']), ['connect_supabase']),
+        # date_id range dim_date already covers; a full load re-checks the table itself
+        'calendar': (lambda r: (
+            new_calendar_range() if r['run_date'] is None
+            else state['calendar'] or load_calendar_range(settings['calendar_cache_path'])
+        ), ['run_date']),
+        # Per-table watermarks of the last run (a full load starts over; a
+        # failed read fails the run); the extract/stream stage raises them
+        # in place to what it read
+        'watermarks': (lambda r: (
+            {} if r['run_date'] is None else execute_with_retry(r['connect_supabase'], get_watermarks)
+        ), ['connect_supabase', 'prepare_warehouse', 'run_date']),
+        # Where each source table's incremental read starts
+        'since': (lambda r: incremental_since(r['watermarks'], r['run_date']), ['watermarks', 'run_date']),
+        # Source tables that needn't be read; ends the run when nothing changed
+        'probe': (lambda r: probe_changes(r['connect_mysql'], r['watermarks'], r['run_date']),
+                  ['connect_mysql', 'watermarks', 'since', 'run_date']),
+    }
+    warehouse = ['connect_supabase', 'prepare_warehouse', 'run_date', 'since']
+
+    if settings['stream_chunksize'] > 0:
+        print(f"Streaming mode: {settings['stream_chunksize']} rows per chunk")
+        stages['load'] = (lambda r: run_streaming(
+            r['connect_mysql'], r['connect_supabase'], r['since'], settings, date_cache, norm_maps, r['calendar'],
+            r['watermarks'], r['probe']
+        ), ['connect_mysql', 'calendar', 'watermarks', 'probe'] + warehouse)
+        load_stages = ['load']
+        watermark = lambda r: started_at
+    else:
+        # 3. Extract data from source (only the delta since the last run)
+        def extract(r):
+            extracted, extracted_at = extract_or_restage(
+                r['connect_mysql'], r['run_date'], r['since'], started_at, settings, r['probe']
+            )
+            frames = dict(zip(STAGED_TABLES, extracted))
+            for name, df in frames.items():
+                observe_watermarks(r['watermarks'], name, df)
+            return frames, extracted_at
+        stages['extract'] = (extract, ['connect_mysql', 'run_date', 'since', 'watermarks', 'probe'])
+        frames = lambda r: r['extract'][0]
+
+        # 4. Transform data into dimension and fact tables
+        stages['transform_dim_product'] = (lambda r: transform_product_dimension(frames(r)['Products'], norm_maps), ['extract'])
+        stages['transform_dim_user'] = (lambda r: transform_user_dimension(frames(r)['Users'], date_cache, norm_maps), ['extract'])
+        stages['transform_dim_rider'] = (lambda r: transform_rider_dimension(frames(r)['Riders'], frames(r)['Couriers']), ['extract'])
+        stages['parse_delivery_dates'] = (lambda r: parse_delivery_dates(frames(r)['Orders'], date_cache), ['extract'])
+
+        def transform_facts(r):
+            fact_orders = transform_fact_table(
+                frames(r)['OrderItems'], frames(r)['Orders'], frames(r)['Products'], r['parse_delivery_dates']
+            )
+            print(f"Total fact records: {len(fact_orders)}")
+            print(f"Records with missing product_id: {fact_orders['product_id'].isna().sum()}")
+            print(f"Records with missing unit_price: {fact_orders['unit_price'].isna().sum()}")
+            return fact_orders
+        stages['transform_fact_orders'] = (transform_facts, ['extract', 'parse_delivery_dates'])
+
+        # 5. Load data into data warehouse: dimensions and dates first
+        def dimension_loader(table_name, id_column):
+            return lambda r: load_dimension(
+                r['connect_supabase'], r[f"transform_{table_name}"], table_name, id_column, r['since'], settings
+            )
+        for table_name, id_column in DIMENSION_TABLES:
+            stages[f"load_{table_name}"] = (dimension_loader(table_name, id_column), [f"transform_{table_name}"] + warehouse)
+        stages['load_dim_date'] = (lambda r: (
+            {'dim_date'} if extend_calendar(r['connect_supabase'], r['parse_delivery_dates'], r['calendar'], settings) > 0
+            else set()
+        ), ['parse_delivery_dates', 'calendar'] + warehouse)
+
+        # Then the fact table (over several connections when ETL_LOAD_WORKERS > 1)
+        def load_fact_orders(r):
+            supabase_engine, fact_orders = r['connect_supabase'], r['transform_fact_orders']
+            run_date = table_since(r['since'], WAREHOUSE_SOURCES['fact_orders'])
+            fact_method = load_method_for(settings, 'fact_orders')
+            if settings['load_workers'] > 1:
+                load = lambda: load_fact_parallel(
+                    supabase_engine, fact_orders, run_date, fact_method, settings['write_mode'], settings['load_workers']
+                )
+            else:
+                load = lambda: load_fact_table(supabase_engine, fact_orders, run_date, fact_method, settings['write_mode'])
+            loaded = load_facts(supabase_engine, load, large_fact_load(run_date, len(fact_orders), settings))
+            return {'fact_orders'} if loaded > 0 else set()
+        dimension_loads = [f"load_{table_name}" for table_name, _ in DIMENSION_TABLES] + ['load_dim_date']
+        stages['load_fact_orders'] = (load_fact_orders, ['transform_fact_orders'] + dimension_loads + warehouse)
+        load_stages = dimension_loads + ['load_fact_orders']
+        watermark = lambda r: r['extract'][1]
+
+    # Bring the dashboard aggregates up to date (full rebuild or only the changed slices)
+    def refresh(r):
+        touched = set().union(*(r[name] for name in load_stages))
+        return touched | refresh_aggregates(r['connect_supabase'], touched, full=r['run_date'] is None)
+    stages['refresh_aggregates'] = (refresh, load_stages + ['connect_supabase', 'run_date'])
+
+    # Dashboard indexes exist and planner statistics match the new data
+    def maintain_indexes(r):
+        ensure_managed_indexes(r['connect_supabase'])
+        analyze_tables(r['connect_supabase'], r['refresh_aggregates'])
+    stages['maintain_indexes'] = (maintain_indexes, ['refresh_aggregates', 'connect_supabase'])
+
+    # 6. Record successful ETL run; returns the recorded watermark
+    def record_run(r):
+        record_etl_run(r['connect_supabase'], watermark(r))
+        record_watermarks(r['connect_supabase'], r['watermarks'])
+        return watermark(r)
+    stages['record_run'] = (
+        record_run, ['maintain_indexes', 'connect_supabase', 'watermarks'] + (['extract'] if 'extract' in stages else [])
+    )
+    return stages
+
+def run_etl_cycle(mysql_conn_str, supabase_conn_str, settings, state):
+    """Run the ETL once from state and keep its caches there.
+
+    The connect stages store the engines in state themselves, so a cycle
+    that fails later still leaves them for the next one to reuse.
+
+    Returns the watermark recorded for the run, or None when the change
+    probe found nothing to do.
+    """
+    current_run_timestamp = datetime.now()
+    results = run_stages(
+        etl_stages(mysql_conn_str, supabase_conn_str, settings, state, current_run_timestamp),
+        settings['stage_workers']
+    )
+    if 'record_run' not in results:
+        # Skipped by the change probe: nothing was loaded, so there is nothing to save
+        return None
+
+    calendar = results['calendar']
+    state['calendar'] = calendar
+
+    if settings['date_cache_path']:
+        save_date_cache(settings['date_cache_path'], state['date_cache'])
+    if settings['normalization_cache_path']:
+        save_normalization_maps(settings['normalization_cache_path'], state['norm_maps'])
+    if settings['calendar_cache_path'] and calendar['min_date_id'] is not None:
+        save_calendar_range(settings['calendar_cache_path'], calendar)
+    return results['record_run']
+
+def run_daemon(mysql_conn_str, supabase_conn_str, settings):
+    """Run incremental cycles every ETL_DAEMON_INTERVAL seconds until interrupted.
+
+    Engines and caches stay warm between cycles; a failed cycle is reported
+    and retried on the next tick.
+    """
+    interval = settings['daemon_interval']
+    state = new_run_state(settings)
+    print(f"ETL daemon started, polling every {interval}s (Ctrl+C to stop)")
+    try:
+        while True:
+            cycle_start = time.monotonic()
+            try:
+                watermark = run_etl_cycle(mysql_conn_str, supabase_conn_str, settings, state)
+                if watermark is None:
+                    print(f"ETL cycle skipped, no source changes ({time.monotonic() - cycle_start:.3f}s)")
+                else:
+                    print(f"ETL cycle completed at {watermark} in {time.monotonic() - cycle_start:.2f}s")
+            except Exception as e:
+                print(f"ETL cycle failed: {e}")
+                traceback.print_exc()
+            time.sleep(max(0.0, interval - (time.monotonic() - cycle_start)))
+    except KeyboardInterrupt:
+        print("ETL daemon stopped")
+    finally:
+        for engine in (state['mysql_engine'], state['supabase_engine']):
+            if engine is not None:
+                engine.dispose()
+
 def main():
     start_time = datetime.now()
     try:
-        # 1. Initialize connections
         mysql_conn_str, supabase_conn_str = load_env_variables()
-        mysql_engine = create_robust_engine(mysql_conn_str)
-        supabase_engine = create_robust_engine(supabase_conn_str, retries=5, delay=10)
-        
-        # 2. Extract data from source
-        orders_df, order_items_df, products_df, users_df, riders_df, couriers_df = extract_source_tables(mysql_engine)
-        
-        # 3. Transform data into dimension and fact tables
-        dim_product = transform_product_dimension(products_df)
-        dim_user = transform_user_dimension(users_df)
-        dim_rider = transform_rider_dimension(riders_df, couriers_df)
-        dim_date, parsed_delivery_dates = transform_date_dimension(orders_df)
-        fact_orders = transform_fact_table(order_items_df, orders_df, products_df, parsed_delivery_dates)
-        
-        print(f"Total fact records: {len(fact_orders)}")
-        print(f"Records with missing product_id: {fact_orders['product_id'].isna().sum()}")
-        print(f"Records with missing unit_price: {fact_orders['unit_price'].isna().sum()}")
-        
-        # 4. Get last ETL run time for incremental loading
-        try:
-            etl_runs = execute_with_retry(supabase_engine, get_last_etl_run)
-            
-            if len(etl_runs) > 0:
-                run_date = pd.to_datetime(etl_runs.iloc[0]['run_date'], utc=True)
-                print(f"Last ETL run was at: {run_date}")
-            else:
-                # No previous runs, do full load - use UTC-aware timestamp
-                run_date = pd.Timestamp('1970-01-01', tz='UTC')
-                print("No previous ETL runs found. Performing full load.")
-        except Exception as e:
-            print(f"Error checking last ETL run: {e}")
-            print("Defaulting to full load.")
-            run_date = pd.Timestamp('1970-01-01', tz='UTC')
-        
-        current_run_timestamp = datetime.now()
-        
-        # 5. Load data into data warehouse
-        # Load dimensions first
-        load_dimension_table(supabase_engine, dim_product, 'dim_product', 'product_id', run_date)
-        load_dimension_table(supabase_engine, dim_user, 'dim_user', 'user_id', run_date)
-        load_dimension_table(supabase_engine, dim_rider, 'dim_rider', 'rider_id', run_date)
-        load_date_dimension(supabase_engine, dim_date)
-        
-        # Then load fact table
-        load_fact_table(supabase_engine, fact_orders, run_date)
-        
-        # 6. Record successful ETL run
-        record_etl_run(supabase_engine, current_run_timestamp)
-        
-        print(f"ETL completed successfully at {current_run_timestamp}")
+        settings = load_etl_settings()
+        if '--daemon' in sys.argv[1:]:
+            run_daemon(mysql_conn_str, supabase_conn_str, settings)
+            return
+
+        current_run_timestamp = run_etl_cycle(mysql_conn_str, supabase_conn_str, settings, new_run_state(settings))
+
+        if current_run_timestamp is None:
+            print("ETL skipped: no source changes since the last run")
+        else:
+            print(f"ETL completed successfully at {current_run_timestamp}")
         elapsed = datetime.now() - start_time
         print(f"ETL total runtime: {elapsed}")
-        
+
     except Exception as e:
         print(f"Critical error in ETL process: {e}")
         traceback.print_exc()
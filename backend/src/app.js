@@ -131,15 +131,8 @@ app.get('/query7', async (req, res) => {
   const percentile_threshold = req.query.percentile || 10;
   const year = req.query.year ? parseInt(req.query.year) : 2025;
   const quarter = req.query.quarter ? parseInt(req.query.quarter) : 1;
-  let prevYear = year;
-  let prevQuarter = quarter - 1;
 
-  if (quarter === 1) {
-    prevQuarter = 4;
-    prevYear = year - 1;
-  }
-
-  const params = [year,quarter,prevYear,prevQuarter,country,percentile_threshold];
+  const params = [year,quarter,country,percentile_threshold];
 
   const startTime = process.hrtime.bigint();
   try {
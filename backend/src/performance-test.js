@@ -181,8 +181,8 @@ async function runPerformanceTests() {
         await testQueryPerformance('QUERY6 - Vehicle Deliveries', queries.QUERY6, [2024, 10]);
         
         // QUERY7 - Top Percentile Riders (NOW FIXED!)
-        // Parameters: [country, city, category, percentile_threshold, year, quarter]
-        await testQueryPerformance('QUERY7 - Top Percentile Riders', queries.QUERY7, ['Philippines', null, null, 90, 2024, 4]);
+        // Parameters: [year, quarter, country, percentile_threshold]
+        await testQueryPerformance('QUERY7 - Top Percentile Riders', queries.QUERY7, [2024, 4, 'Philippines', 90]);
         
         await testQueryPerformance('QUERY8 - Revenue ROLLUP', queries.QUERY8, [2025, 'Philippines', 'Canton', null]);
         await testQueryPerformance('QUERY9 - Enhanced Revenue ROLLUP', queries.QUERY9, [2025, null, null, null]);
@@ -1,4 +1,5 @@
 // Query #1 -> Revenue Rollup by time granularity (OPTIMIZED)
+// Reads the ETL-maintained daily aggregate (agg_daily_sales) instead of fact_orders
 // $1::int  -> start_date_id (e.g., 20240101)
 // $2::int  -> end_date_id   (e.g., 20241231)
 // $3::text -> category (optional, pass NULL for all categories)
@@ -6,24 +7,23 @@
 const QUERY1 = 
 `WITH base AS (
   SELECT 
-    fo.total_price,
-    fo.quantity,
-    d.date_id,  -- raw numeric date
+    a.revenue,
+    a.units,
+    a.date_id,  -- raw numeric date
     CASE $4::text
-      WHEN 'year'  THEN to_char(to_date(d.date_id::text, 'YYYYMMDD'), 'YYYY')
-      WHEN 'month' THEN to_char(to_date(d.date_id::text, 'YYYYMMDD'), 'YYYY-MM')
-      WHEN 'day'   THEN to_char(to_date(d.date_id::text, 'YYYYMMDD'), 'YYYY-MM-DD')
+      WHEN 'year'  THEN to_char(to_date(a.date_id::text, 'YYYYMMDD'), 'YYYY')
+      WHEN 'month' THEN to_char(to_date(a.date_id::text, 'YYYYMMDD'), 'YYYY-MM')
+      WHEN 'day'   THEN to_char(to_date(a.date_id::text, 'YYYYMMDD'), 'YYYY-MM-DD')
     END AS period
-  FROM fact_orders fo
-  JOIN dim_product p ON fo.product_id = p.product_id
-  JOIN dim_date d ON fo.delivery_date_id = d.date_id
-  WHERE ($3::text IS NULL OR p.category = $3::text)
-    AND d.date_id BETWEEN $1::int AND $2::int  -- raw, indexable filter
+  FROM agg_daily_sales a
+  WHERE a.has_product  -- same rows as the inner join to dim_product
+    AND ($3::text IS NULL OR a.category = $3::text)
+    AND a.date_id BETWEEN $1::int AND $2::int  -- raw, indexable filter
 )
 SELECT
   period,
-  SUM(total_price) AS revenue,
-  SUM(quantity) AS units_sold
+  SUM(revenue) AS revenue,
+  SUM(units)::bigint AS units_sold
 FROM base
 GROUP BY period
 ORDER BY period;`;
@@ -62,6 +62,7 @@ ORDER BY
 LIMIT $1::int;`;
 
 // Query #4 -> 3-month moving average and optionally filters (or not) by country (OPTIMIZED)
+// Reads the ETL-maintained daily aggregate (agg_daily_sales) instead of fact_orders
 // $1::text -> country (optional, pass NULL for all countries)
 const QUERY4 =
 `SELECT
@@ -80,13 +81,13 @@ FROM (
   SELECT
     d.year,
     d.month,
-    du.country,
-    SUM(fo.total_price) AS total_sales
-  FROM fact_orders fo
-  JOIN dim_date d ON fo.delivery_date_id = d.date_id
-  JOIN dim_user du ON fo.user_id = du.user_id
-  WHERE ($1::text IS NULL OR du.country = $1::text)
-  GROUP BY d.year, d.month, du.country
+    a.country,
+    SUM(a.revenue) AS total_sales
+  FROM agg_daily_sales a
+  JOIN dim_date d ON a.date_id = d.date_id
+  WHERE a.has_user  -- same rows as the inner join to dim_user
+    AND ($1::text IS NULL OR a.country = $1::text)
+  GROUP BY d.year, d.month, a.country
 ) AS ms
 ORDER BY ms.year, ms.month, ms.country;`;
 
@@ -122,184 +123,126 @@ WHERE ($1::text IS NULL OR country = $1::text)
 ORDER BY delivery_rank;`;
 
 // Query #6 -> Total Deliveries by Vehicle Type (Optionally by Year and Month), WITH ROLLUP (OPTIMIZED)
+// Reads the ETL-maintained daily aggregate (agg_daily_sales) instead of fact_orders
 // $1::int  -> year (optional, pass NULL for all years)
 // $2::int  -> month (optional, pass NULL for all months)
 const QUERY6 = 
 `SELECT
     d.year,
     d.month,
-    dr.vehicle_type,
-    COUNT(fo.fact_id) AS total_deliveries
-FROM fact_orders fo
-JOIN dim_rider dr ON fo.rider_id = dr.rider_id
-JOIN dim_date d ON fo.delivery_date_id = d.date_id
+    a.vehicle_type,
+    COALESCE(SUM(a.deliveries), 0)::bigint AS total_deliveries
+FROM agg_daily_sales a
+JOIN dim_date d ON a.date_id = d.date_id
 WHERE
-    ($1::int IS NULL OR d.year = $1::int)
+    a.has_rider  -- same rows as the inner join to dim_rider
+    AND ($1::int IS NULL OR d.year = $1::int)
     AND ($2::int IS NULL OR d.month = $2::int)
-GROUP BY ROLLUP (d.year, d.month, dr.vehicle_type)
-ORDER BY d.year, d.month, dr.vehicle_type;`;
+GROUP BY ROLLUP (d.year, d.month, a.vehicle_type)
+ORDER BY d.year, d.month, a.vehicle_type;`;
 
 //This query identifies the top X% of riders in total revenue in a particular COUNTRY in a particular quarterly time period with time based on delivery date. Include also previous sales records
 // (to put simply, Top X% riders in _ Country, _ Period)
 
-// $1::text -> year
-// $2::text -> quarter
-// $3::text -> previous year 
-// $4::int  -> previous quarter
-// $5::text  -> country
-// $6::int -> percentile
+// Reads the ETL-maintained quarterly snapshot (agg_rider_quarterly), which already holds the
+// previous quarter's sales, the growth and the percentile within the country and quarter
+// $1::int  -> year
+// $2::int  -> quarter
+// $3::text -> country
+// $4::int  -> percentile
 const QUERY7 = 
-`WITH rider_quarterly AS (
-    SELECT
-        du.country, 
-        fo.rider_id,
-        dd.year,dd.quarter, 
-        SUM(fo.total_price) AS total_sales,
-        COUNT(DISTINCT fo.user_id) AS customers_served
-    FROM fact_orders AS fo
-    JOIN dim_date AS dd 
-        ON fo.delivery_date_id = dd.date_id
-        AND (
-            (dd.year = $1::int AND dd.quarter = $2::int)  -- current quarter
-             OR (dd.year = $3::int AND dd.quarter = $4::int)  -- previous quarter
-        )
-    JOIN dim_user AS du 
-        ON fo.user_id = du.user_id
-        AND du.country = $5::text
-    GROUP BY du.country, fo.rider_id, dd.year, dd.quarter
-),
-
-ranked_with_growth AS (
-    SELECT
-        country, 
-        rider_id,
-        year, quarter,
-        total_sales,
-        customers_served,
-        LAG(total_sales) OVER (
-            PARTITION BY country, rider_id 
-            ORDER BY year, quarter
-        ) AS prev_quarter_sales,
-        ROUND(
-            ((total_sales - LAG(total_sales) OVER (
-                PARTITION BY country, rider_id 
-                ORDER BY year, quarter
-            )) / NULLIF(LAG(total_sales) OVER (
-                PARTITION BY country, rider_id 
-                ORDER BY year, quarter
-            ), 0)) * 100, 2
-        ) AS sales_growth_pct,
-        ROUND(
-            PERCENT_RANK() OVER (
-                PARTITION BY country, year, quarter
-                ORDER BY total_sales DESC
-            )::numeric * 100, 2
-        ) AS sales_percentile
-    FROM rider_quarterly
-)
-
-SELECT
+`SELECT
     country, 
     CONCAT(year, '-Q', quarter) AS period,
     rider_id,
     total_sales,
     prev_quarter_sales, sales_growth_pct,
     customers_served, sales_percentile
-FROM ranked_with_growth
+FROM agg_rider_quarterly
 WHERE
-   CONCAT(year, '-Q', quarter) = CONCAT($1::int, '-Q', $2::int)
-    AND sales_percentile <= $6::int  
+    country = $3::text
+    AND year = $1::int
+    AND quarter = $2::int
+    AND sales_percentile <= $4::int
 ORDER BY country, total_sales DESC;
 `;
 
 // Query #8 -> Revenue analysis with ROLLUP by country, city, and category for a specific year
+// Reads the ETL-maintained yearly cube (agg_revenue_rollup): the ROLLUP levels are
+// grouping_level 0 (country, city, category), 1 (country, city), 3 (country) and 7 (total).
+// unique_riders is a HyperLogLog estimate (within ~3%), merged by the ETL from per-day sketches
 // $1::int  -> year (required, e.g., 2025)
 // $2::text -> country (optional, pass NULL for all countries, e.g., 'Philippines')
 // $3::text -> city (optional, pass NULL for all cities, e.g., 'Canton')
 // $4::text -> category (optional, pass NULL for all categories, e.g., 'BAG')
 const QUERY8 = 
-`WITH yearly_revenue_base AS (
-    -- Step 1: Base data for the year being summarized.
+`WITH cube_rows AS (
     SELECT
-        du.country,
-        du.city,
-        dp.category,
-        dr.rider_id,
-        fo.total_price
+        COALESCE(country, 'Grand Total') AS country,
+        COALESCE(city, 'All Cities') AS city,
+        COALESCE(category, 'All Categories') AS category,
+        total_revenue,
+        unique_riders
     FROM
-        fact_orders AS fo
-    JOIN
-        dim_rider AS dr ON fo.rider_id = dr.rider_id
-    JOIN
-        dim_user AS du ON fo.user_id = du.user_id
-    JOIN
-        dim_date AS dd ON fo.delivery_date_id = dd.date_id
-    JOIN
-        dim_product AS dp ON fo.product_id = dp.product_id
+        agg_revenue_rollup
     WHERE
-        dd.year = $1::int
+        year = $1::int
+        AND grouping_level IN (0, 1, 3, 7)
+        AND ($2::text IS NULL OR country = $2::text)
+        AND ($3::text IS NULL OR city = $3::text)
+        AND ($4::text IS NULL OR category = $4::text)
 )
--- Final Step: Use a more granular ROLLUP and a flexible HAVING clause.
-SELECT
-    COALESCE(country, 'Grand Total') AS country,
-    COALESCE(city, 'All Cities') AS city,
-    COALESCE(category, 'All Categories') AS category,
-    SUM(total_price) AS total_revenue,
-    COUNT(DISTINCT rider_id) AS unique_riders
-FROM
-    yearly_revenue_base
-GROUP BY
-    ROLLUP(country, city, category)
-HAVING
-    ($2::text IS NULL OR country = $2::text)
-    AND ($3::text IS NULL OR city = $3::text)
-    AND ($4::text IS NULL OR category = $4::text)
+SELECT * FROM cube_rows
+UNION ALL
+-- ROLLUP over a year without sales still returns an empty grand total
+SELECT 'Grand Total', 'All Cities', 'All Categories', NULL, 0
+WHERE $2::text IS NULL AND $3::text IS NULL AND $4::text IS NULL
+    AND NOT EXISTS (SELECT 1 FROM cube_rows)
 ORDER BY
     country, city, category;`;
 
 // Query #9 -> Revenue analysis with ROLLUP by country, city, and category with enhanced metrics
+// Filters apply before the rollup, so each ROLLUP level is read from the cube level that
+// also keeps the filtered columns (level & ~filter_mask); filtered-only columns are shown rolled up
 // $1::int  -> year (required, e.g., 2025)
 // $2::text -> country (optional, pass NULL for all countries, e.g., 'Philippines')
 // $3::text -> city (optional, pass NULL for all cities, e.g., 'Canton')
 // $4::text -> category (optional, pass NULL for all categories, e.g., 'BAG')
 const QUERY9 = 
-`WITH yearly_revenue_base AS (
-    -- Step 1: Base data for the year being summarized.
+`WITH rollup_levels(rollup_level) AS (
+    VALUES (0), (1), (3), (7)
+),
+filter_mask AS (
     SELECT
-        du.country,
-        du.city,
-        dp.category,
-        dr.rider_id,
-        fo.total_price
+        (CASE WHEN $2::text IS NULL THEN 0 ELSE 4 END)
+        | (CASE WHEN $3::text IS NULL THEN 0 ELSE 2 END)
+        | (CASE WHEN $4::text IS NULL THEN 0 ELSE 1 END) AS mask
+),
+cube_rows AS (
+    SELECT
+        COALESCE(CASE WHEN l.rollup_level & 4 = 0 THEN c.country END, 'Grand Total') AS country,
+        COALESCE(CASE WHEN l.rollup_level & 2 = 0 THEN c.city END, 'All Cities') AS city,
+        COALESCE(CASE WHEN l.rollup_level & 1 = 0 THEN c.category END, 'All Categories') AS category,
+        c.total_revenue,
+        c.unique_riders,
+        c.total_revenue / NULLIF(c.line_count, 0) AS average_order_value
     FROM
-        fact_orders AS fo
-    JOIN
-        dim_rider AS dr ON fo.rider_id = dr.rider_id
-    JOIN
-        dim_user AS du ON fo.user_id = du.user_id
+        rollup_levels AS l
+    CROSS JOIN
+        filter_mask AS f
     JOIN
-        dim_date AS dd ON fo.delivery_date_id = dd.date_id
-    JOIN
-        dim_product AS dp ON fo.product_id = dp.product_id
+        agg_revenue_rollup AS c ON c.grouping_level = (l.rollup_level & ~f.mask)
     WHERE
-        -- Filters are now applied here for maximum efficiency.
-        dd.year = $1::int
-        AND ($2::text IS NULL OR du.country = $2::text)
-        AND ($3::text IS NULL OR du.city = $3::text)
-        AND ($4::text IS NULL OR dp.category = $4::text)
+        c.year = $1::int
+        AND ($2::text IS NULL OR c.country = $2::text)
+        AND ($3::text IS NULL OR c.city = $3::text)
+        AND ($4::text IS NULL OR c.category = $4::text)
 )
--- Final Step: Use ROLLUP to generate summaries for the filtered data.
-SELECT
-    COALESCE(country, 'Grand Total') AS country,
-    COALESCE(city, 'All Cities') AS city,
-    COALESCE(category, 'All Categories') AS category,
-    SUM(total_price) AS total_revenue,
-    COUNT(DISTINCT rider_id) AS unique_riders,
-    AVG(total_price) AS average_order_value
-FROM
-    yearly_revenue_base
-GROUP BY
-    ROLLUP(country, city, category)
+SELECT * FROM cube_rows
+UNION ALL
+-- ROLLUP over no matching sales still returns an empty grand total
+SELECT 'Grand Total', 'All Cities', 'All Categories', NULL, 0, NULL
+WHERE NOT EXISTS (SELECT 1 FROM cube_rows)
 ORDER BY
     country, city, category;`;
 
@@ -1,33 +1,189 @@
-from .extract import extract_source_tables, get_last_etl_run
+from .extract import (
+    extract_source_tables,
+    extract_source_table,
+    extract_tables,
+    extract_source_range,
+    get_key_ranges,
+    stream_source_table,
+    stream_order_items,
+    probe_source_tables,
+    get_last_etl_run
+)
 from .transform import (
     transform_product_dimension,
     transform_user_dimension,
     transform_rider_dimension,
-    transform_date_dimension,
-    transform_fact_table
+    parse_delivery_dates,
+    transform_fact_table,
+    fact_keys
 )
 from .load import (
     load_dimension_table,
-    load_date_dimension,
+    ensure_calendar,
     load_fact_table,
+    load_fact_chunks,
+    widen_fact_id,
+    load_fact_parallel,
     record_etl_run
 )
-from .utils import load_env_variables, create_robust_engine, execute_with_retry
+from .copy_loader import copy_dataframe
+from .dates import (
+    parse_dates,
+    date_ids_from_dates,
+    calendar_attributes,
+    calendar_range,
+    date_from_id,
+    load_date_cache,
+    save_date_cache,
+    new_calendar_range,
+    load_calendar_range,
+    save_calendar_range
+)
+from .normalize import (
+    normalize_values,
+    new_normalization_maps,
+    load_normalization_maps,
+    save_normalization_maps
+)
+from .staging import (
+    STAGED_TABLES,
+    write_staging_snapshot,
+    find_staging_snapshot,
+    read_staging_snapshot,
+    prune_staging_snapshots
+)
+from .partitions import (
+    partition_fact_table,
+    ensure_fact_partitions,
+    is_partitioned
+)
+from .indexes import (
+    MANAGED_INDEXES,
+    drop_managed_indexes,
+    ensure_managed_indexes,
+    analyze_tables
+)
+from .aggregates import (
+    AGGREGATE_TABLES,
+    CHANGE_LOG_TABLE,
+    record_fact_changes,
+    record_dimension_changes,
+    ensure_aggregate_tables,
+    refresh_aggregate,
+    refresh_aggregate_slices,
+    refresh_aggregates
+)
+from .sketches import (
+    HLL_PRECISION,
+    HLL_ERROR,
+    SKETCH_TABLE,
+    build_sketches,
+    merge_sketches,
+    estimate_distinct,
+    refresh_sketches,
+    cube_partials,
+    distinct_counts
+)
+from .watermarks import (
+    WATERMARK_TABLE,
+    ensure_watermark_table,
+    get_watermarks,
+    incremental_since,
+    table_since,
+    changed_tables,
+    unchanged_reads,
+    apply_probe,
+    observe_watermarks,
+    record_watermarks
+)
+from .dag import SkipRemaining, stage_order, critical_path, report_stages, run_stages
+from .utils import load_env_variables, load_etl_settings, create_robust_engine, execute_with_retry
 
 # Export all the functions
 __all__ = [
     'extract_source_tables',
+    'extract_source_table',
+    'extract_tables',
+    'extract_source_range',
+    'get_key_ranges',
+    'stream_source_table',
+    'stream_order_items',
+    'probe_source_tables',
     'get_last_etl_run',
     'transform_product_dimension',
     'transform_user_dimension',
     'transform_rider_dimension',
-    'transform_date_dimension',
+    'parse_delivery_dates',
     'transform_fact_table',
+    'fact_keys',
     'load_dimension_table',
-    'load_date_dimension',
+    'ensure_calendar',
     'load_fact_table',
+    'load_fact_chunks',
+    'widen_fact_id',
+    'load_fact_parallel',
     'record_etl_run',
+    'copy_dataframe',
+    'parse_dates',
+    'date_ids_from_dates',
+    'calendar_attributes',
+    'calendar_range',
+    'date_from_id',
+    'load_date_cache',
+    'save_date_cache',
+    'new_calendar_range',
+    'load_calendar_range',
+    'save_calendar_range',
+    'normalize_values',
+    'new_normalization_maps',
+    'load_normalization_maps',
+    'save_normalization_maps',
+    'STAGED_TABLES',
+    'write_staging_snapshot',
+    'find_staging_snapshot',
+    'read_staging_snapshot',
+    'prune_staging_snapshots',
+    'partition_fact_table',
+    'ensure_fact_partitions',
+    'is_partitioned',
+    'MANAGED_INDEXES',
+    'drop_managed_indexes',
+    'ensure_managed_indexes',
+    'analyze_tables',
+    'AGGREGATE_TABLES',
+    'CHANGE_LOG_TABLE',
+    'record_fact_changes',
+    'record_dimension_changes',
+    'ensure_aggregate_tables',
+    'refresh_aggregate',
+    'refresh_aggregate_slices',
+    'refresh_aggregates',
+    'HLL_PRECISION',
+    'HLL_ERROR',
+    'SKETCH_TABLE',
+    'build_sketches',
+    'merge_sketches',
+    'estimate_distinct',
+    'refresh_sketches',
+    'cube_partials',
+    'distinct_counts',
+    'WATERMARK_TABLE',
+    'ensure_watermark_table',
+    'get_watermarks',
+    'incremental_since',
+    'table_since',
+    'changed_tables',
+    'unchanged_reads',
+    'apply_probe',
+    'observe_watermarks',
+    'record_watermarks',
+    'SkipRemaining',
+    'stage_order',
+    'critical_path',
+    'report_stages',
+    'run_stages',
     'load_env_variables',
+    'load_etl_settings',
     'create_robust_engine',
     'execute_with_retry'
 ]
\ No newline at end of file
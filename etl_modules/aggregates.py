@@ -0,0 +1,360 @@
+from sqlalchemy import text
+
+from .sketches import SKETCH_TABLE, SKETCH_DDL, refresh_sketches, cube_partials
+
+# Quarter numbers (year * 4 + quarter - 1) of the touched days, shifted by each offset
+TOUCHED_QUARTERS = """
+    SELECT DISTINCT t.q + n.offset_by FROM (
+        SELECT date_id / 10000 * 4 + (date_id / 100 % 100 - 1) / 3 AS q FROM {touched}
+    ) t CROSS JOIN (VALUES {offsets}) n(offset_by)
+"""
+
+# Warehouse tables the sketch table's per-day partials (sketches.py) are derived from
+SKETCH_SOURCES = {'fact_orders', 'dim_date', 'dim_product', 'dim_user', 'dim_rider'}
+
+# Sales and distinct customers per rider, country and quarter
+RIDER_QUARTERS = 'etl_rider_quarters'
+
+RIDER_QUARTERS_SELECT = """
+    SELECT
+        du.country,
+        fo.rider_id,
+        dd.year, dd.quarter,
+        SUM(fo.total_price) AS total_sales,
+        COUNT(DISTINCT fo.user_id) AS customers_served
+    FROM fact_orders fo
+    JOIN dim_date dd ON fo.delivery_date_id = dd.date_id
+    JOIN dim_user du ON fo.user_id = du.user_id
+    {where}
+    GROUP BY du.country, fo.rider_id, dd.year, dd.quarter
+"""
+
+# The same rider in the same country one quarter earlier
+PREVIOUS_QUARTER = """
+    p.country IS NOT DISTINCT FROM c.country
+    AND p.rider_id IS NOT DISTINCT FROM c.rider_id
+    AND p.year * 4 + p.quarter = c.year * 4 + c.quarter - 1
+"""
+
+def _refresh_revenue_rollup(conn, touched=None):
+    """Merge agg_revenue_rollup from the sketch table for every year, or the years in the touched temp table.
+
+    Reads the year's per-day partials, not its facts; refresh the sketch
+    table first. Returns (rows deleted, rows written).
+    """
+    if touched is None:
+        deleted = conn.execute(text("DELETE FROM agg_revenue_rollup")).rowcount
+        years = conn.execute(text(f"SELECT DISTINCT date_id / 10000 FROM {SKETCH_TABLE}")).scalars().all()
+    else:
+        deleted = 0
+        years = conn.execute(text(f"SELECT DISTINCT date_id / 10000 FROM {touched}")).scalars().all()
+    written = 0
+    for year in sorted(years):
+        if touched is not None:
+            deleted += conn.execute(text("DELETE FROM agg_revenue_rollup WHERE year = :year"), {'year': year}).rowcount
+        # QUERY8/9 join dim_product and dim_rider
+        rows = cube_partials(
+            conn, "WHERE date_id >= :low AND date_id < :high AND has_product AND has_rider",
+            {'low': year * 10000, 'high': (year + 1) * 10000}
+        )
+        rows.to_sql('agg_revenue_rollup', conn, if_exists='append', index=False, method='multi', chunksize=500)
+        written += len(rows)
+    return deleted, written
+
+def _refresh_rider_quarterly(conn, touched=None):
+    """Recompute agg_rider_quarterly, or only the quarters with a day in the touched temp table.
+
+    A touched quarter is rebuilt from its own facts and takes the previous
+    quarter's sales from the snapshot; the quarter after it keeps its rows
+    and only gets the new prev_quarter_sales and growth. Returns
+    (rows deleted, rows written).
+    """
+    if touched is None:
+        where, in_touched = '', 'TRUE'
+    else:
+        touched_quarters = TOUCHED_QUARTERS.format(offsets='(0)', touched=touched)
+        where = f"WHERE dd.year * 4 + dd.quarter - 1 IN ({touched_quarters})"
+        in_touched = f"year * 4 + quarter - 1 IN ({touched_quarters})"
+    conn.execute(text(f"DROP TABLE IF EXISTS {RIDER_QUARTERS}"))
+    conn.execute(text(
+        f"CREATE TEMP TABLE {RIDER_QUARTERS} ON COMMIT DROP AS {RIDER_QUARTERS_SELECT.format(where=where)}"
+    ))
+    deleted = conn.execute(text(f"DELETE FROM agg_rider_quarterly WHERE {in_touched}")).rowcount
+    written = conn.execute(text(f"""
+        INSERT INTO agg_rider_quarterly
+        SELECT
+            c.country,
+            c.rider_id,
+            c.year, c.quarter,
+            c.total_sales,
+            c.customers_served,
+            p.total_sales AS prev_quarter_sales,
+            ROUND(((c.total_sales - p.total_sales) / NULLIF(p.total_sales, 0)) * 100, 2) AS sales_growth_pct,
+            ROUND(
+                PERCENT_RANK() OVER (
+                    PARTITION BY c.country, c.year, c.quarter
+                    ORDER BY c.total_sales DESC
+                )::numeric * 100, 2
+            ) AS sales_percentile
+        FROM {RIDER_QUARTERS} c
+        LEFT JOIN (
+            SELECT country, rider_id, year, quarter, total_sales FROM {RIDER_QUARTERS}
+            UNION ALL
+            SELECT country, rider_id, year, quarter, total_sales FROM agg_rider_quarterly
+            WHERE year * 4 + quarter IN (SELECT DISTINCT year * 4 + quarter - 1 FROM {RIDER_QUARTERS})
+        ) p ON {PREVIOUS_QUARTER}
+    """)).rowcount
+    if touched is not None:
+        next_quarters = TOUCHED_QUARTERS.format(offsets='(1)', touched=touched)
+        conn.execute(text(f"""
+            UPDATE agg_rider_quarterly c SET (prev_quarter_sales, sales_growth_pct) = (
+                SELECT
+                    p.total_sales,
+                    ROUND(((c.total_sales - p.total_sales) / NULLIF(p.total_sales, 0)) * 100, 2)
+                FROM {RIDER_QUARTERS} p
+                WHERE {PREVIOUS_QUARTER}
+            )
+            WHERE year * 4 + quarter - 1 IN ({next_quarters}) AND NOT ({in_touched})
+        """))
+    return deleted, written
+
+# Dashboard aggregates maintained by the ETL. Each one lists its DDL, the
+# index its readers look it up by, the warehouse tables it is derived from and
+# either the query that computes it from the warehouse ({where} narrows the
+# facts read to a slice) with the slice condition used for incremental
+# refreshes, or a refresh(conn, touched=None) function that rebuilds it (or
+# only what the touched days affect) itself.
+AGGREGATE_TABLES = {
+    # Day x category x country x vehicle_type sales, read by QUERY1/4/6 instead
+    # of fact_orders. Every dimension is left-joined and has_* records whether
+    # the match existed, so a query can keep its inner-join semantics by
+    # filtering on the flags of the dimensions it used to join.
+    'agg_daily_sales': {
+        'ddl': """
+            CREATE TABLE IF NOT EXISTS agg_daily_sales (
+                date_id integer NOT NULL,
+                category text,
+                country text,
+                vehicle_type text,
+                has_product boolean NOT NULL,
+                has_user boolean NOT NULL,
+                has_rider boolean NOT NULL,
+                revenue numeric NOT NULL,
+                units bigint NOT NULL,
+                deliveries bigint NOT NULL
+            )
+        """,
+        'index': "(date_id)",
+        'select': """
+            SELECT
+                fo.delivery_date_id AS date_id,
+                p.category,
+                u.country,
+                r.vehicle_type,
+                p.product_id IS NOT NULL AS has_product,
+                u.user_id IS NOT NULL AS has_user,
+                r.rider_id IS NOT NULL AS has_rider,
+                COALESCE(SUM(fo.total_price), 0) AS revenue,
+                COALESCE(SUM(fo.quantity), 0) AS units,
+                COUNT(*) AS deliveries
+            FROM fact_orders fo
+            JOIN dim_date d ON fo.delivery_date_id = d.date_id
+            LEFT JOIN dim_product p ON fo.product_id = p.product_id
+            LEFT JOIN dim_user u ON fo.user_id = u.user_id
+            LEFT JOIN dim_rider r ON fo.rider_id = r.rider_id
+            {where}
+            GROUP BY 1, 2, 3, 4, 5, 6, 7
+        """,
+        # refreshed per delivery day
+        'slice': "date_id IN (SELECT date_id FROM {touched})",
+        'slice_filter': "fo.delivery_date_id IN (SELECT date_id FROM {touched})",
+        'sources': {'fact_orders', 'dim_date', 'dim_product', 'dim_user', 'dim_rider'},
+    },
+    # Yearly CUBE over country/city/category for the QUERY8/QUERY9 drill-down.
+    # grouping_level is GROUPING(country, city, category): bit 4 = country,
+    # 2 = city, 1 = category rolled up. The ROLLUP levels are 0, 1, 3 and 7;
+    # the other combinations let QUERY9 roll up data pre-filtered by city or
+    # category. Merged from the per-day partials in the sketch table rather
+    # than from fact_orders; unique_riders isn't additive, so every level
+    # stores the estimate of its own merged rider sketch.
+    'agg_revenue_rollup': {
+        'ddl': """
+            CREATE TABLE IF NOT EXISTS agg_revenue_rollup (
+                year smallint NOT NULL,
+                grouping_level smallint NOT NULL,
+                country text,
+                city text,
+                category text,
+                total_revenue numeric NOT NULL,
+                line_count bigint NOT NULL,
+                unique_riders bigint NOT NULL
+            )
+        """,
+        'index': "(year, grouping_level, country, city, category)",
+        # refreshed per year, after the sketch table
+        'refresh': _refresh_revenue_rollup,
+        'sources': SKETCH_SOURCES,
+    },
+    # Rider x country x quarter sales for QUERY7 with the previous quarter's
+    # sales, growth and PERCENT_RANK within the country/quarter precomputed.
+    # Only the touched quarters are recomputed from fact_orders; the quarter
+    # after each one just takes the new previous-quarter sales.
+    'agg_rider_quarterly': {
+        'ddl': """
+            CREATE TABLE IF NOT EXISTS agg_rider_quarterly (
+                country text,
+                rider_id integer,
+                year smallint NOT NULL,
+                quarter smallint NOT NULL,
+                total_sales numeric,
+                customers_served bigint NOT NULL,
+                prev_quarter_sales numeric,
+                sales_growth_pct numeric,
+                sales_percentile numeric NOT NULL
+            )
+        """,
+        'index': "(country, year, quarter, sales_percentile)",
+        'refresh': _refresh_rider_quarterly,
+        'sources': {'fact_orders', 'dim_date', 'dim_user'},
+    },
+}
+
+# Keys touched by incremental loads since the last aggregate refresh. Fact
+# loads log the old and new delivery date of every rewritten line; dimension
+# loads log the changed ids (in the column of their fact key), which are
+# resolved to the dates of the facts that reference them at refresh time.
+CHANGE_LOG_TABLE = 'etl_fact_changes'
+
+CHANGE_LOG_DDL = f"""
+CREATE TABLE IF NOT EXISTS {CHANGE_LOG_TABLE} (
+    source text NOT NULL,
+    delivery_date_id integer,
+    user_id integer,
+    product_id integer,
+    rider_id integer
+)
+"""
+
+# Fact columns a dimension's changed ids are logged under
+DIMENSION_KEYS = {'dim_user': 'user_id', 'dim_product': 'product_id', 'dim_rider': 'rider_id'}
+
+TOUCHED_DATES = 'etl_touched_dates'
+
+def _change_log_exists(conn):
+    return conn.execute(text("SELECT to_regclass(:t)"), {'t': CHANGE_LOG_TABLE}).scalar() is not None
+
+def record_fact_changes(conn, where_sql, params=None):
+    """Log the delivery dates of the fact_orders lines matching where_sql.
+
+    Called before and after lines are rewritten, so both the days a line
+    left and the days it moved to are refreshed. Does nothing when the
+    change log table doesn't exist.
+    """
+    if not _change_log_exists(conn):
+        return
+    conn.execute(text(f"""
+        INSERT INTO {CHANGE_LOG_TABLE} (source, delivery_date_id)
+        SELECT DISTINCT 'fact_orders', delivery_date_id
+        FROM fact_orders WHERE {where_sql}
+    """), params or {})
+
+def record_dimension_changes(conn, table_name, ids):
+    """Log the ids of changed dimension rows (for dimensions the aggregates group by)"""
+    key = DIMENSION_KEYS.get(table_name)
+    if key is None or len(ids) == 0 or not _change_log_exists(conn):
+        return
+    conn.execute(
+        text(f"INSERT INTO {CHANGE_LOG_TABLE} (source, {key}) VALUES (:source, :id)"),
+        [{'source': table_name, 'id': int(id_)} for id_ in ids]
+    )
+
+def ensure_aggregate_tables(engine):
+    """Create the aggregate tables (and their lookup indexes), the sketch table and the change log if they don't exist"""
+    with engine.begin() as conn:
+        for table_name, aggregate in AGGREGATE_TABLES.items():
+            conn.execute(text(aggregate['ddl']))
+            conn.execute(text(f"CREATE INDEX IF NOT EXISTS idx_{table_name}_lookup ON {table_name} {aggregate['index']}"))
+        conn.execute(text(SKETCH_DDL))
+        conn.execute(text(f"CREATE INDEX IF NOT EXISTS idx_{SKETCH_TABLE}_lookup ON {SKETCH_TABLE} (date_id)"))
+        conn.execute(text(CHANGE_LOG_DDL))
+
+def refresh_aggregate(engine, table_name):
+    """Rebuild one aggregate from the warehouse in a single transaction"""
+    aggregate = AGGREGATE_TABLES[table_name]
+    with engine.begin() as conn:
+        if 'refresh' in aggregate:
+            _, rows = aggregate['refresh'](conn)
+        else:
+            conn.execute(text(f"DELETE FROM {table_name}"))
+            rows = conn.execute(text(f"INSERT INTO {table_name} {aggregate['select'].format(where='')}")).rowcount
+    print(f"Refreshed {table_name} ({rows} rows)")
+    return rows
+
+def _collect_touched_dates(conn):
+    """Temp table of the delivery days affected by the logged changes; returns how many"""
+    dimension_dates = [
+        f"""SELECT f.delivery_date_id FROM fact_orders f
+            JOIN {CHANGE_LOG_TABLE} c ON c.source = '{table_name}' AND f.{key} = c.{key}"""
+        for table_name, key in DIMENSION_KEYS.items()
+    ]
+    union = '\nUNION\n'.join([
+        f"SELECT delivery_date_id FROM {CHANGE_LOG_TABLE} WHERE source = 'fact_orders'"
+    ] + dimension_dates)
+    conn.execute(text(f"DROP TABLE IF EXISTS {TOUCHED_DATES}"))
+    conn.execute(text(f"""
+        CREATE TEMP TABLE {TOUCHED_DATES} ON COMMIT DROP AS
+        SELECT delivery_date_id AS date_id FROM ({union}) d
+        WHERE delivery_date_id IS NOT NULL
+    """))
+    return conn.execute(text(f"SELECT COUNT(*) FROM {TOUCHED_DATES}")).scalar()
+
+def refresh_aggregate_slices(engine):
+    """Recompute only the aggregate slices touched by logged changes, then clear the log.
+
+    Everything runs in one transaction, so a failed refresh leaves the log
+    in place for the next run. Returns the aggregates that were rewritten.
+    """
+    refreshed = set()
+    with engine.begin() as conn:
+        touched_days = _collect_touched_dates(conn)
+        if touched_days > 0:
+            # The per-day partials first: agg_revenue_rollup is merged from them
+            refresh_sketches(conn, TOUCHED_DATES)
+            refreshed.add(SKETCH_TABLE)
+            for table_name, aggregate in AGGREGATE_TABLES.items():
+                if 'refresh' in aggregate:
+                    deleted, rows = aggregate['refresh'](conn, TOUCHED_DATES)
+                else:
+                    deleted = conn.execute(text(
+                        f"DELETE FROM {table_name} WHERE {aggregate['slice'].format(touched=TOUCHED_DATES)}"
+                    )).rowcount
+                    where = f"WHERE {aggregate['slice_filter'].format(touched=TOUCHED_DATES)}"
+                    rows = conn.execute(text(f"INSERT INTO {table_name} {aggregate['select'].format(where=where)}")).rowcount
+                print(f"Refreshed {table_name} for {touched_days} touched days ({deleted} rows replaced by {rows})")
+                refreshed.add(table_name)
+        conn.execute(text(f"DELETE FROM {CHANGE_LOG_TABLE}"))
+    return refreshed
+
+def refresh_aggregates(engine, touched, full=False):
+    """Bring the aggregates up to date after a load; returns the ones rewritten.
+
+    full=True (a full load) rebuilds every aggregate derived from a touched
+    table and discards the change log; otherwise only the logged slices are
+    recomputed.
+    """
+    if not full:
+        return refresh_aggregate_slices(engine)
+
+    refreshed = set()
+    # The per-day partials first: agg_revenue_rollup is merged from them
+    if SKETCH_SOURCES & set(touched):
+        with engine.begin() as conn:
+            refresh_sketches(conn)
+        refreshed.add(SKETCH_TABLE)
+    for table_name, aggregate in AGGREGATE_TABLES.items():
+        if aggregate['sources'] & set(touched):
+            refresh_aggregate(engine, table_name)
+            refreshed.add(table_name)
+    with engine.begin() as conn:
+        conn.execute(text(f"DELETE FROM {CHANGE_LOG_TABLE}"))
+    return refreshed
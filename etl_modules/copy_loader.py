@@ -0,0 +1,57 @@
+class _CsvStream:
+    """Read-only file object that renders a DataFrame as CSV one slice at a time.
+
+    COPY pulls from read() as it sends data, so only one slice of CSV text
+    exists at any moment instead of the whole file.
+    """
+
+    def __init__(self, df, rows_per_chunk=10000):
+        self._chunks = (
+            df.iloc[start:start + rows_per_chunk].to_csv(index=False, header=False, na_rep='')
+            for start in range(0, len(df), rows_per_chunk)
+        )
+        self._buffer = ''
+
+    def read(self, size=-1):
+        while size is None or size < 0 or len(self._buffer) < size:
+            try:
+                self._buffer += next(self._chunks)
+            except StopIteration:
+                break
+        if size is None or size < 0:
+            data, self._buffer = self._buffer, ''
+        else:
+            data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+    def chunks(self):
+        """Iterate over the CSV slices directly (for drivers that push data)"""
+        if self._buffer:
+            yield self._buffer
+            self._buffer = ''
+        yield from self._chunks
+
+def copy_dataframe(conn, df, table_name, rows_per_chunk=10000):
+    """Append a DataFrame to a Postgres table with COPY FROM STDIN.
+
+    Runs on the DBAPI connection behind the SQLAlchemy connection, so it is
+    part of the caller's transaction. Works with psycopg2 and psycopg 3.
+    """
+    if len(df) == 0:
+        return 0
+
+    columns = ', '.join(f'"{column}"' for column in df.columns)
+    copy_sql = f"COPY {table_name} ({columns}) FROM STDIN WITH (FORMAT csv)"
+    stream = _CsvStream(df, rows_per_chunk)
+
+    cursor = conn.connection.cursor()
+    try:
+        if hasattr(cursor, 'copy_expert'):
+            cursor.copy_expert(copy_sql, stream)
+        else:
+            with cursor.copy(copy_sql) as copy:
+                for chunk in stream.chunks():
+                    copy.write(chunk)
+    finally:
+        cursor.close()
+    return len(df)
\ No newline at end of file
@@ -0,0 +1,108 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+# An ETL run is declared as {name: (func, dependencies)}. A stage starts as
+# soon as every dependency has finished and is called with a dict of their
+# results, so independent stages (connections, dimension transforms/loads)
+# overlap and the run takes as long as its longest chain.
+
+class SkipRemaining(Exception):
+    """Raised by a stage to end the run early (e.g. nothing to do); not an error"""
+
+def stage_order(stages):
+    """Stage names in dependency order; raises ValueError on unknown dependencies or cycles"""
+    for name, (_, dependencies) in stages.items():
+        unknown = [dep for dep in dependencies if dep not in stages]
+        if unknown:
+            raise ValueError(f"Stage {name} depends on unknown stages {unknown}")
+
+    order, visiting, done = [], set(), set()
+    def visit(name, path):
+        if name in done:
+            return
+        if name in visiting:
+            raise ValueError(f"Stage dependency cycle: {' -> '.join(path + [name])}")
+        visiting.add(name)
+        for dep in stages[name][1]:
+            visit(dep, path + [name])
+        visiting.discard(name)
+        done.add(name)
+        order.append(name)
+    for name in stages:
+        visit(name, [])
+    return order
+
+def _timed(func, inputs):
+    start = time.perf_counter()
+    result = func(inputs)
+    return result, start, time.perf_counter()
+
+def critical_path(stages, timings):
+    """Chain of stages that determined the run's end: from the last stage to
+    finish, repeatedly follow the dependency that finished last"""
+    if not timings:
+        return []
+    name = max(timings, key=lambda n: timings[n][1])
+    path = [name]
+    while True:
+        finished = [dep for dep in stages[name][1] if dep in timings]
+        if not finished:
+            return path[::-1]
+        name = max(finished, key=lambda n: timings[n][1])
+        path.append(name)
+
+def report_stages(stages, timings):
+    """Print every stage's duration and the critical path"""
+    if not timings:
+        return
+    run_start = min(start for start, _ in timings.values())
+    run_end = max(end for _, end in timings.values())
+    for name, (start, end) in sorted(timings.items(), key=lambda item: item[1][0]):
+        print(f"  {name:<24} {start - run_start:8.2f}s -> {end - run_start:8.2f}s ({end - start:.2f}s)")
+    path = critical_path(stages, timings)
+    chain = ' -> '.join(f"{name} ({timings[name][1] - timings[name][0]:.2f}s)" for name in path)
+    serial = sum(end - start for start, end in timings.values())
+    print(f"Critical path: {chain}")
+    print(f"Stages took {run_end - run_start:.2f}s wall clock ({serial:.2f}s if run one after another)")
+
+def run_stages(stages, max_workers=4):
+    """Run the stages on a thread pool, each once its dependencies are done.
+
+    Returns {name: result}. When a stage fails no new stages are started;
+    the ones already running finish and the first error is re-raised. A
+    stage raising SkipRemaining stops the run the same way, but the results
+    gathered so far are returned instead.
+    """
+    order = stage_order(stages)
+    pending = set(stages)
+    running, results, timings = {}, {}, {}
+    failure = skipped = None
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+        while True:
+            if failure is None and skipped is None:
+                for name in order:
+                    func, dependencies = stages[name]
+                    if name in pending and all(dep in results for dep in dependencies):
+                        pending.discard(name)
+                        running[pool.submit(_timed, func, {dep: results[dep] for dep in dependencies})] = name
+            if not running:
+                break
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                try:
+                    results[name], start, end = future.result()
+                    timings[name] = (start, end)
+                except SkipRemaining as e:
+                    print(f"Stage {name} ended the run early: {e}")
+                    skipped = e
+                except Exception as e:
+                    print(f"Stage {name} failed: {e}")
+                    if failure is None:
+                        failure = e
+
+    report_stages(stages, timings)
+    if failure is not None:
+        raise failure
+    return results
@@ -0,0 +1,111 @@
+import json
+import os
+import pandas as pd
+
+# Known source formats, tried in order before the generic fallback
+DATE_FORMATS = [
+    (r'^\d{4}-\d{2}-\d{2}$', '%Y-%m-%d'),      # iso
+    (r'^\d{1,2}/\d{1,2}/\d{4}$', '%m/%d/%Y'),  # m/d/y
+]
+
+# Text left behind by str() on missing values
+NULL_STRINGS = {'': None, 'nan': None, 'NaT': None, 'None': None, '<NA>': None}
+
+def _parse_distinct(raw):
+    """Parse a Series of distinct date strings into midnight datetimes"""
+    parsed = pd.Series(pd.NaT, index=raw.index, dtype='datetime64[ns]')
+
+    # Parse slices with explicit formats (fast + strict)
+    for pattern, fmt in DATE_FORMATS:
+        mask = raw.str.match(pattern, na=False) & parsed.isna()
+        if mask.any():
+            parsed.loc[mask] = pd.to_datetime(raw.loc[mask], format=fmt, errors='coerce')
+
+    # Generic fallback for remaining values (handles e.g. "YYYY-MM-DD HH:MM:SS")
+    remaining = parsed.isna()
+    if remaining.any():
+        fallback = pd.to_datetime(raw.loc[remaining], format='mixed', errors='coerce', utc=True)
+        parsed.loc[remaining] = fallback.dt.tz_localize(None)
+
+    return parsed.dt.normalize()
+
+def parse_dates(values, cache=None):
+    """Parse raw date values to midnight datetimes, parsing each distinct string once.
+
+    cache maps raw strings to parsed dates (NaT for unparseable ones) and is
+    filled in place, so passing the same dict to several calls, or one loaded
+    with load_date_cache, skips strings that were already seen.
+    """
+    if cache is None:
+        cache = {}
+
+    raw = values.astype('string').str.strip().replace(NULL_STRINGS)
+    codes, uniques = pd.factorize(raw)
+
+    unseen = [value for value in uniques if value not in cache]
+    if len(unseen) > 0:
+        parsed = _parse_distinct(pd.Series(unseen, dtype='string'))
+        cache.update(zip(unseen, parsed))
+
+    unique_dates = pd.DatetimeIndex([cache[value] for value in uniques], dtype='datetime64[ns]')
+    dates = unique_dates.take(codes, allow_fill=True, fill_value=pd.NaT)
+    return pd.Series(dates, index=values.index)
+
+def date_ids_from_dates(dates):
+    """Vectorized YYYYMMDD integer keys for a datetime Series (NA where missing)"""
+    date_ids = dates.dt.year * 10000 + dates.dt.month * 100 + dates.dt.day
+    return date_ids.astype('Int64')
+
+def calendar_attributes(dates):
+    """Build dim_date rows for a Series of distinct midnight datetimes"""
+    dates = pd.Series(dates).reset_index(drop=True)
+    return pd.DataFrame({
+        'date_id': date_ids_from_dates(dates).astype('int64'),
+        'year': dates.dt.year.astype('int16'),
+        'quarter': dates.dt.quarter.astype('int16'),
+        'month': dates.dt.month.astype('int16'),
+        'day': dates.dt.day.astype('int16'),
+        'day_of_week': dates.dt.dayofweek.astype('int16'),
+        'is_weekend': dates.dt.dayofweek.isin([5, 6]).astype('bool'),
+    })
+
+def calendar_range(first, last):
+    """dim_date rows for every day from first to last (inclusive)"""
+    return calendar_attributes(pd.Series(pd.date_range(pd.Timestamp(first).normalize(), pd.Timestamp(last).normalize(), freq='D')))
+
+def date_from_id(date_id):
+    """Midnight Timestamp for a YYYYMMDD key"""
+    return pd.to_datetime(str(int(date_id)), format='%Y%m%d')
+
+def load_date_cache(path):
+    """Load a persisted raw-string -> date cache (empty if the file doesn't exist)"""
+    if not path or not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        stored = json.load(f)
+    return {raw: pd.Timestamp(value) if value else pd.NaT for raw, value in stored.items()}
+
+def save_date_cache(path, cache):
+    """Persist a date cache so later runs skip strings already parsed"""
+    stored = {raw: None if pd.isna(value) else value.strftime('%Y-%m-%d') for raw, value in cache.items()}
+    with open(path, 'w') as f:
+        json.dump(stored, f)
+    print(f"Saved {len(stored)} parsed date strings to {path}")
+
+def new_calendar_range():
+    """Empty record of the date_id range dim_date is known to cover"""
+    return {'min_date_id': None, 'max_date_id': None}
+
+def load_calendar_range(path):
+    """Load the covered dim_date range recorded by an earlier run (empty if none)"""
+    calendar = new_calendar_range()
+    if path and os.path.exists(path):
+        with open(path) as f:
+            calendar.update(json.load(f))
+    return calendar
+
+def save_calendar_range(path, calendar):
+    """Persist the covered dim_date range so the next run needs no lookup"""
+    with open(path, 'w') as f:
+        json.dump(calendar, f)
+    print(f"Saved dim_date range {calendar['min_date_id']}..{calendar['max_date_id']} to {path}")
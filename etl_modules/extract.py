@@ -1,58 +1,346 @@
 import pandas as pd
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from sqlalchemy import text
 
-def extract_source_tables(mysql_engine):
-    """Extract all required tables from source database"""
-    orders_df = pd.read_sql(
-        """
-        SELECT id, orderNumber, userId, deliveryDate, deliveryRiderId, createdAt, updatedAt
-        FROM Orders
-        """, 
-        mysql_engine
-    )
+try:
+    import pyarrow  # noqa: F401
+    STRING_DTYPE = 'string[pyarrow]'
+    DTYPE_BACKEND = 'pyarrow'
+except ImportError:
+    STRING_DTYPE = 'string'
+    DTYPE_BACKEND = 'numpy_nullable'
+
+# Orders touched since their watermarks, either directly or through one of their items
+CHANGED_ORDER_IDS = """
+    SELECT id FROM Orders WHERE updatedAt > :since_Orders
+    UNION
+    SELECT OrderId FROM OrderItems WHERE updatedAt > :since_OrderItems
+"""
+
+# Columns pulled from each source table, the key used to order/slice reads and
+# the filter that limits an incremental read to rows the next load needs
+# (:since_<Table> is that table's watermark)
+SOURCE_TABLES = {
+    'Orders': {
+        'columns': "id, orderNumber, userId, deliveryDate, deliveryRiderId, createdAt, updatedAt",
+        'key': 'id',
+        'incremental': f"id IN ({CHANGED_ORDER_IDS})",
+    },
+    'OrderItems': {
+        'columns': "OrderId, ProductId, quantity, notes, createdAt, updatedAt",
+        'key': 'OrderId',
+        # every item of a touched order, so the whole order can be rebuilt
+        'incremental': f"OrderId IN ({CHANGED_ORDER_IDS})",
+    },
+    'Products': {
+        'columns': "id, productCode, category, description, name, price, createdAt, updatedAt",
+        'key': 'id',
+        # changed products plus the prices needed by the rebuilt orders
+        'incremental': f"updatedAt > :since_Products OR id IN (SELECT ProductId FROM OrderItems WHERE OrderId IN ({CHANGED_ORDER_IDS}))",
+    },
+    'Users': {
+        'columns': "id, username, firstName, lastName, address1, address2, city, country, zipCode, phoneNumber, dateOfBirth, gender, createdAt, updatedAt",
+        'key': 'id',
+        'incremental': "updatedAt > :since_Users",
+    },
+    'Riders': {
+        'columns': "id, firstName, lastName, vehicleType, courierId, age, gender, createdAt, updatedAt",
+        'key': 'id',
+        # a courier rename changes dim_rider too
+        'incremental': "updatedAt > :since_Riders OR courierId IN (SELECT id FROM Couriers WHERE updatedAt > :since_Couriers)",
+    },
+    'Couriers': {
+        'columns': "id, name AS courier_name, createdAt, updatedAt",
+        'key': 'id',
+        'incremental': "updatedAt > :since_Couriers OR id IN (SELECT courierId FROM Riders WHERE updatedAt > :since_Riders)",
+    },
+}
+
+# Dtypes applied to every read: nullable ints for foreign keys, float prices
+# instead of Decimal objects, categoricals for low-cardinality labels and
+# Arrow-backed strings (when pyarrow is installed) for free text. deliveryDate
+# and dateOfBirth stay strings because the source mixes date formats.
+SOURCE_DTYPES = {
+    'Orders': {
+        'id': 'int64', 'orderNumber': STRING_DTYPE, 'userId': 'Int64',
+        'deliveryDate': STRING_DTYPE, 'deliveryRiderId': 'Int64',
+        'createdAt': 'datetime64[ns]', 'updatedAt': 'datetime64[ns]',
+    },
+    'OrderItems': {
+        'OrderId': 'int64', 'ProductId': 'Int64', 'quantity': 'Int32', 'notes': STRING_DTYPE,
+        'createdAt': 'datetime64[ns]', 'updatedAt': 'datetime64[ns]',
+    },
+    'Products': {
+        'id': 'int64', 'productCode': STRING_DTYPE, 'category': 'category',
+        'description': STRING_DTYPE, 'name': STRING_DTYPE, 'price': 'float64',
+        'createdAt': 'datetime64[ns]', 'updatedAt': 'datetime64[ns]',
+    },
+    'Users': {
+        'id': 'int64', 'username': STRING_DTYPE, 'firstName': STRING_DTYPE, 'lastName': STRING_DTYPE,
+        'address1': STRING_DTYPE, 'address2': STRING_DTYPE, 'city': 'category', 'country': 'category',
+        'zipCode': STRING_DTYPE, 'phoneNumber': STRING_DTYPE, 'dateOfBirth': STRING_DTYPE,
+        'gender': 'category', 'createdAt': 'datetime64[ns]', 'updatedAt': 'datetime64[ns]',
+    },
+    'Riders': {
+        'id': 'int64', 'firstName': STRING_DTYPE, 'lastName': STRING_DTYPE, 'vehicleType': 'category',
+        'courierId': 'Int64', 'age': 'Int16', 'gender': 'category',
+        'createdAt': 'datetime64[ns]', 'updatedAt': 'datetime64[ns]',
+    },
+    'Couriers': {
+        'id': 'int64', 'courier_name': 'category',
+        'createdAt': 'datetime64[ns]', 'updatedAt': 'datetime64[ns]',
+    },
+}
 
-    order_items_df = pd.read_sql(
-        """
-        SELECT OrderId, ProductId, quantity, notes, createdAt, updatedAt 
-        FROM OrderItems
-        """, 
-        mysql_engine
+def _read_dtypes(table_name):
+    """The SOURCE_DTYPES read_sql can apply itself (datetimes are parsed afterwards)"""
+    return {
+        column: dtype for column, dtype in SOURCE_DTYPES[table_name].items()
+        if dtype != 'datetime64[ns]'
+    }
+
+def _read_source(query, con, table_name, params=None, chunksize=None):
+    """pd.read_sql a source query with its dtypes applied while each frame (or chunk) is built.
+
+    Rows go into Arrow-backed (or nullable) columns rather than whole
+    object/Decimal columns that are only cast once the read has finished.
+    """
+    return pd.read_sql(
+        query, con, params=params, chunksize=chunksize,
+        dtype=_read_dtypes(table_name), dtype_backend=DTYPE_BACKEND
     )
 
-    products_df = pd.read_sql(
-        """
-        SELECT id, productCode, category, description, name, price, createdAt, updatedAt 
-        FROM Products
-        """, 
-        mysql_engine
+def _apply_source_dtypes(df, table_name):
+    """Cast an extracted frame to the explicit dtypes in SOURCE_DTYPES"""
+    for column, dtype in SOURCE_DTYPES[table_name].items():
+        if column not in df.columns or df[column].dtype == dtype:
+            continue
+        if dtype == 'datetime64[ns]':
+            df[column] = pd.to_datetime(df[column], errors='coerce')
+        elif dtype in ('int64', 'Int64', 'Int32', 'Int16', 'float64'):
+            df[column] = pd.to_numeric(df[column], errors='coerce').astype(dtype)
+        elif dtype == 'category':
+            # Values stay strings; the categorical only stores each distinct label once
+            df[column] = df[column].astype(STRING_DTYPE).astype('category')
+        else:
+            df[column] = df[column].astype(dtype)
+    return df
+
+def source_dependencies(table_name):
+    """Source tables whose watermarks an incremental read of table_name filters on"""
+    return set(re.findall(r':since_(\w+)', SOURCE_TABLES[table_name]['incremental']))
+
+def empty_source_frame(table_name):
+    """Zero-row frame shaped like an extract of table_name"""
+    return _apply_source_dtypes(pd.DataFrame(columns=list(SOURCE_DTYPES[table_name])), table_name)
+
+def _source_timestamp(since):
+    """Convert a UTC watermark into the naive UTC datetime MySQL compares against"""
+    since = pd.Timestamp(since)
+    if since.tzinfo is not None:
+        since = since.tz_convert('UTC').tz_localize(None)
+    return since.to_pydatetime()
+
+def _source_filters(table_name, since=None):
+    """Return the WHERE clauses and params for a (possibly incremental) read.
+
+    since is one watermark for every table or a {table: watermark} dict.
+    """
+    if since is None:
+        return [], {}
+    if not isinstance(since, dict):
+        since = dict.fromkeys(SOURCE_TABLES, since)
+    params = {f"since_{name}": _source_timestamp(watermark) for name, watermark in since.items()}
+    return [f"({SOURCE_TABLES[table_name]['incremental']})"], params
+
+def _source_query(table_name, where=None, order_by=None):
+    """Build the SELECT statement for a source table"""
+    sql = f"SELECT {SOURCE_TABLES[table_name]['columns']} FROM {table_name}"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    if order_by:
+        sql += f" ORDER BY {order_by}"
+    return text(sql)
+
+def extract_source_table(mysql_engine, table_name, since=None):
+    """Extract a single source table into a DataFrame.
+
+    With a watermark only the rows changed after it (and the rows needed to
+    rebuild the affected orders) are read.
+    """
+    where, params = _source_filters(table_name, since)
+    df = _read_source(_source_query(table_name, where=where), mysql_engine, table_name, params=params)
+    return _apply_source_dtypes(df, table_name)
+
+def extract_source_range(mysql_engine, table_name, low, high, since=None):
+    """Extract the rows of a source table whose key lies in [low, high]"""
+    key = SOURCE_TABLES[table_name]['key']
+    where, params = _source_filters(table_name, since)
+    where.append(f"{key} BETWEEN :low AND :high")
+    params.update({'low': int(low), 'high': int(high)})
+    df = _read_source(
+        _source_query(table_name, where=where, order_by=key),
+        mysql_engine,
+        table_name,
+        params=params
     )
+    return _apply_source_dtypes(df, table_name)
+
+def stream_source_table(mysql_engine, table_name, chunksize=50000, since=None):
+    """Yield a source table as DataFrame chunks ordered by its key.
+
+    Uses a server-side cursor so only one chunk is held in memory at a time.
+    """
+    key = SOURCE_TABLES[table_name]['key']
+    where, params = _source_filters(table_name, since)
+    with mysql_engine.connect().execution_options(stream_results=True, max_row_buffer=chunksize) as conn:
+        query = _source_query(table_name, where=where, order_by=key)
+        for chunk in _read_source(query, conn, table_name, params=params, chunksize=chunksize):
+            yield _apply_source_dtypes(chunk, table_name)
+
+def stream_order_items(mysql_engine, chunksize=50000, since=None):
+    """Yield OrderItems chunks that never split an order across two chunks"""
+    pending = None
+    for chunk in stream_source_table(mysql_engine, 'OrderItems', chunksize, since):
+        if len(chunk) == 0:
+            continue
+        if pending is not None:
+            chunk = pd.concat([pending, chunk], ignore_index=True)
+        # Hold back the trailing order; its remaining items may be in the next chunk
+        last_order = chunk['OrderId'].iloc[-1]
+        is_last = chunk['OrderId'] == last_order
+        pending = chunk[is_last]
+        if (~is_last).any():
+            yield chunk[~is_last].reset_index(drop=True)
+    if pending is not None and len(pending) > 0:
+        yield pending.reset_index(drop=True)
+
+def get_key_ranges(mysql_engine, table_name, partitions, since=None):
+    """Split a table's key span into up to `partitions` contiguous [low, high] ranges"""
+    key = SOURCE_TABLES[table_name]['key']
+    where, params = _source_filters(table_name, since)
+    sql = f"SELECT MIN({key}) AS low, MAX({key}) AS high FROM {table_name}"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    bounds = pd.read_sql(text(sql), mysql_engine, params=params).iloc[0]
+    if pd.isna(bounds['low']):
+        return []
+
+    low, high = int(bounds['low']), int(bounds['high'])
+    partitions = max(1, min(partitions, high - low + 1))
+    step = -(-(high - low + 1) // partitions)  # ceiling division
+    return [(start, min(start + step - 1, high)) for start in range(low, high + 1, step)]
+
+def _timed_extract(mysql_engine, table_name, since=None, key_range=None):
+    """Extract one table (or one key range of it) and report how long the read took"""
+    start = time.perf_counter()
+    if key_range is None:
+        df = extract_source_table(mysql_engine, table_name, since)
+        label = table_name
+    else:
+        df = extract_source_range(mysql_engine, table_name, key_range[0], key_range[1], since)
+        label = f"{table_name}[{key_range[0]}..{key_range[1]}]"
+    print(f"Extracted {len(df)} rows from {label} in {time.perf_counter() - start:.2f}s")
+    return df
 
-    users_df = pd.read_sql(
-        """
-        SELECT id, username, firstName, lastName, address1, address2, city, country, zipCode, phoneNumber, dateOfBirth, gender, createdAt, updatedAt 
-        FROM Users
-        """, 
-        mysql_engine
+def extract_tables(mysql_engine, table_names, since=None, max_workers=1, partitions=None, skip=None):
+    """Extract several source tables, concurrently when max_workers > 1.
+
+    partitions maps a table name to a number of key ranges to read it in (e.g.
+    {'OrderItems': 8}); the ranges are read as separate tasks and stitched back
+    in key order. Each worker reads through its own pooled connection, so
+    max_workers should stay within the engine's pool_size + max_overflow.
+    Tables in skip aren't read and come back empty.
+    """
+    partitions = partitions or {}
+    skip = set(skip or ())
+    tasks = []
+    for name in table_names:
+        if name in skip:
+            continue
+        if partitions.get(name, 1) > 1:
+            tasks.extend((name, key_range) for key_range in get_key_ranges(mysql_engine, name, partitions[name], since))
+        else:
+            tasks.append((name, None))
+
+    if max_workers <= 1 or len(tasks) <= 1:
+        results = [_timed_extract(mysql_engine, name, since, key_range) for name, key_range in tasks]
+    else:
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(tasks))) as executor:
+            futures = [executor.submit(_timed_extract, mysql_engine, name, since, key_range) for name, key_range in tasks]
+            results = [future.result() for future in futures]
+
+    frames = {}
+    for name in table_names:
+        if name in skip:
+            print(f"Skipped {name} (unchanged)")
+            frames[name] = empty_source_frame(name)
+            continue
+        pieces = [df for (task_name, _), df in zip(tasks, results) if task_name == name]
+        if len(pieces) == 0:
+            # Partitioned table with no rows in range
+            pieces = [empty_source_frame(name)]
+        frames[name] = pieces[0] if len(pieces) == 1 else pd.concat(pieces, ignore_index=True)
+    return frames
+
+def extract_source_tables(mysql_engine, since=None, max_workers=1, partitions=1, skip=None):
+    """Extract all required tables from source database
+
+    Pass the last run's watermark (or a {table: watermark} dict) as since to read incrementally,
+    max_workers > 1 to read the tables in parallel and partitions > 1 to
+    split Orders and OrderItems into that many key ranges. Tables in skip
+    aren't read and come back empty.
+    """
+    start = time.perf_counter()
+    frames = extract_tables(
+        mysql_engine,
+        ['Orders', 'OrderItems', 'Products', 'Users', 'Riders', 'Couriers'],
+        since,
+        max_workers,
+        partitions={'Orders': partitions, 'OrderItems': partitions},
+        skip=skip
     )
+    print(f"Extraction finished in {time.perf_counter() - start:.2f}s")
 
-    riders_df = pd.read_sql(
-        """
-        SELECT id, firstName, lastName, vehicleType, courierId, age, gender, createdAt, updatedAt 
-        FROM Riders
-        """, 
-        mysql_engine
+    return (
+        frames['Orders'], frames['OrderItems'], frames['Products'],
+        frames['Users'], frames['Riders'], frames['Couriers']
     )
 
-    couriers_df = pd.read_sql(
-        """
-        SELECT id, name AS courier_name, createdAt, updatedAt 
-        FROM Couriers
-        """, 
-        mysql_engine
+def _source_now_sql(mysql_engine):
+    """Current UTC time on the source (MySQL's CURRENT_TIMESTAMP follows the session time zone)"""
+    return 'UTC_TIMESTAMP()' if mysql_engine.dialect.name == 'mysql' else 'CURRENT_TIMESTAMP'
+
+def probe_source_tables(mysql_engine, table_names=None):
+    """COUNT(*), MAX(updatedAt) and MAX(key) of each source table in one query.
+
+    Returns {table: {'row_count', 'max_updated_at' (UTC), 'max_id', 'probed_at'}},
+    probed_at being the source's own clock (UTC) when the probe ran.
+    """
+    table_names = list(SOURCE_TABLES) if table_names is None else table_names
+    now = _source_now_sql(mysql_engine)
+    sql = "\nUNION ALL\n".join(
+        f"SELECT '{name}' AS table_name, COUNT(*) AS row_count, MAX(updatedAt) AS max_updated_at, "
+        f"MAX({SOURCE_TABLES[name]['key']}) AS max_id, {now} AS probed_at FROM {name}"
+        for name in table_names
     )
-    
-    return orders_df, order_items_df, products_df, users_df, riders_df, couriers_df
+    start = time.perf_counter()
+    rows = pd.read_sql(text(sql), mysql_engine)
+    rows['max_updated_at'] = pd.to_datetime(rows['max_updated_at'], errors='coerce', utc=True)
+    rows['probed_at'] = pd.to_datetime(rows['probed_at'], errors='coerce', utc=True)
+    print(f"Probed {len(table_names)} source tables in {time.perf_counter() - start:.3f}s")
+    return {
+        row.table_name: {
+            'row_count': int(row.row_count),
+            'max_updated_at': None if pd.isna(row.max_updated_at) else row.max_updated_at,
+            'max_id': None if pd.isna(row.max_id) else int(row.max_id),
+            'probed_at': None if pd.isna(row.probed_at) else row.probed_at,
+        }
+        for row in rows.itertuples(index=False)
+    }
 
 def get_last_etl_run(engine):
     """Retrieve the last ETL run timestamp"""
@@ -60,4 +348,4 @@ def get_last_etl_run(engine):
         "SELECT run_date FROM etl_runs ORDER BY run_date DESC LIMIT 1",
         engine
     )
-    return etl_runs
\ No newline at end of file
+    return etl_runs
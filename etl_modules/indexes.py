@@ -0,0 +1,47 @@
+from sqlalchemy import text
+
+# Secondary indexes behind the dashboard access paths (backend/src/queries.js):
+# fact joins to every dimension plus a BRIN for delivery date range scans.
+# Key/merge indexes (primary keys, fact_id, order_id) are never dropped here.
+MANAGED_INDEXES = {
+    'fact_orders': [
+        ('idx_fact_orders_delivery_date_id', 'btree (delivery_date_id)'),
+        ('idx_fact_orders_user_id', 'btree (user_id)'),
+        ('idx_fact_orders_rider_id', 'btree (rider_id)'),
+        ('idx_fact_orders_product_id', 'btree (product_id)'),
+        ('idx_fact_orders_delivery_date_brin', 'brin (delivery_date_id)'),
+    ],
+}
+
+def drop_managed_indexes(engine, table_names):
+    """Drop the managed secondary indexes of table_names before a large load"""
+    with engine.begin() as conn:
+        for table_name in table_names:
+            for index_name, _ in MANAGED_INDEXES.get(table_name, []):
+                conn.execute(text(f"DROP INDEX IF EXISTS {index_name}"))
+    print(f"Dropped secondary indexes on {', '.join(table_names)}")
+
+def ensure_managed_indexes(engine, table_names=None):
+    """Create any missing managed index (all tables when table_names is None)"""
+    table_names = list(MANAGED_INDEXES) if table_names is None else table_names
+    created = 0
+    with engine.begin() as conn:
+        for table_name in table_names:
+            for index_name, definition in MANAGED_INDEXES.get(table_name, []):
+                exists = conn.execute(text("SELECT to_regclass(:name)"), {'name': index_name}).scalar()
+                if exists is None:
+                    conn.execute(text(f"CREATE INDEX {index_name} ON {table_name} USING {definition}"))
+                    created += 1
+    if created:
+        print(f"Built {created} secondary indexes")
+    return created
+
+def analyze_tables(engine, table_names):
+    """Refresh planner statistics for the tables a run wrote to"""
+    table_names = sorted(set(table_names))
+    if not table_names:
+        return
+    with engine.begin() as conn:
+        for table_name in table_names:
+            conn.execute(text(f"ANALYZE {table_name}"))
+    print(f"Analyzed {', '.join(table_names)}")
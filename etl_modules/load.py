@@ -1,11 +1,176 @@
 #commit
-from sqlalchemy import text
+from sqlalchemy import text, inspect
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 import pandas as pd
 import time
 
-def load_dimension_table(engine, df, table_name, id_column, run_date=None):
-    """Generic function to load dimension tables with incremental update logic"""
+from .copy_loader import copy_dataframe
+from .aggregates import record_fact_changes, record_dimension_changes
+from .dates import calendar_range, date_from_id
+from .partitions import (
+    is_partitioned, ensure_fact_partitions, new_swap_run, create_swap_table, finish_swap_table,
+    swap_table_name, swap_in_partitions, drop_swap_tables
+)
+
+# Write paths a table can be loaded with
+LOAD_METHODS = ('insert', 'copy')
+# How an incremental load applies changed rows: delete + append, or stage + set-based merge
+WRITE_MODES = ('delete_insert', 'merge')
+
+def _write_rows(conn, df, table_name, load_method='insert', **to_sql_kwargs):
+    """Append rows with to_sql ('insert') or COPY FROM STDIN ('copy') and report the rate"""
+    if load_method not in LOAD_METHODS:
+        raise ValueError(f"Unknown load method {load_method!r}; expected one of {LOAD_METHODS}")
+
+    start = time.perf_counter()
+    if load_method == 'copy':
+        copy_dataframe(conn, df, table_name)
+    else:
+        df.to_sql(table_name, conn, if_exists='append', index=False, **to_sql_kwargs)
+    elapsed = time.perf_counter() - start
+    rate = len(df) / elapsed if elapsed > 0 else float('inf')
+    print(f"Wrote {len(df)} rows to {table_name} via {load_method} in {elapsed:.2f}s ({rate:,.0f} rows/s)")
+
+def _check_write_mode(write_mode):
+    if write_mode not in WRITE_MODES:
+        raise ValueError(f"Unknown write mode {write_mode!r}; expected one of {WRITE_MODES}")
+
+def _primary_key_columns(conn, table_name):
+    """Primary key columns of a warehouse table (the ON CONFLICT target)"""
+    return inspect(conn).get_pk_constraint(table_name)['constrained_columns']
+
+def _quoted(columns):
+    return ', '.join(f'"{column}"' for column in columns)
+
+def _stage_rows(conn, df, table_name, load_method='insert'):
+    """Bulk-load rows into a temp table shaped like table_name (dropped at commit)"""
+    stage_name = f"{table_name}_stage"
+    conn.execute(text(f"DROP TABLE IF EXISTS {stage_name}"))
+    conn.execute(text(
+        f"CREATE TEMP TABLE {stage_name} (LIKE {table_name} INCLUDING DEFAULTS) ON COMMIT DROP"
+    ))
+    _write_rows(conn, df, stage_name, load_method, method='multi', chunksize=1000)
+    return stage_name
+
+def _upsert_from_stage(conn, stage_name, table_name, columns, key_columns):
+    """INSERT ... ON CONFLICT DO UPDATE staged rows into table_name
+
+    Rows whose values already match are left untouched, so unchanged rows
+    cost no write. Returns the number of rows inserted or updated.
+    """
+    values = [column for column in columns if column not in key_columns]
+    if values:
+        updates = ', '.join(f'"{column}" = EXCLUDED."{column}"' for column in values)
+        current = ', '.join(f'{table_name}."{column}"' for column in values)
+        excluded = ', '.join(f'EXCLUDED."{column}"' for column in values)
+        on_conflict = f"DO UPDATE SET {updates} WHERE ({current}) IS DISTINCT FROM ({excluded})"
+    else:
+        on_conflict = "DO NOTHING"
+    result = conn.execute(text(f"""
+        INSERT INTO {table_name} ({_quoted(columns)})
+        SELECT {_quoted(columns)} FROM {stage_name}
+        ON CONFLICT ({_quoted(key_columns)}) {on_conflict}
+    """))
+    return result.rowcount
+
+def _merge_fact_stage(conn, stage_name, columns):
+    """Merge all lines of the staged orders into fact_orders by their stable fact_id
+
+    Lines that changed or no longer exist in a staged order are deleted, then
+    staged lines missing from fact_orders are inserted, so unchanged lines are
+    never rewritten. Matching on fact_id without ON CONFLICT keeps this valid
+    for a partitioned fact_orders, where fact_id alone can't be unique.
+    """
+    if is_partitioned(conn):
+        date_ids = pd.read_sql(f"SELECT DISTINCT delivery_date_id FROM {stage_name}", conn)['delivery_date_id']
+        ensure_fact_partitions(conn, date_ids)
+    values = [column for column in columns if column != 'fact_id']
+    staged = ', '.join(f'x."{column}"' for column in values)
+    current = ', '.join(f'f."{column}"' for column in values)
+    staged_orders = f"order_id IN (SELECT order_id FROM {stage_name})"
+    record_fact_changes(conn, staged_orders)
+    deleted = conn.execute(text(f"""
+        DELETE FROM fact_orders f
+        USING (SELECT DISTINCT order_id FROM {stage_name}) s
+        WHERE f.order_id = s.order_id
+          AND NOT EXISTS (
+              SELECT 1 FROM {stage_name} x
+              WHERE x.fact_id = f.fact_id AND ({staged}) IS NOT DISTINCT FROM ({current})
+          )
+    """)).rowcount
+    written = conn.execute(text(f"""
+        INSERT INTO fact_orders ({_quoted(columns)})
+        SELECT {_quoted(columns)} FROM {stage_name} x
+        WHERE NOT EXISTS (SELECT 1 FROM fact_orders f WHERE f.fact_id = x.fact_id)
+    """)).rowcount
+    record_fact_changes(conn, staged_orders)
+    return written, deleted
+
+def _merge_fact_rows(conn, rows, load_method='insert'):
+    """Stage rows of whole orders and merge them into fact_orders"""
+    stage_name = _stage_rows(conn, rows, 'fact_orders', load_method)
+    written, deleted = _merge_fact_stage(conn, stage_name, rows.columns)
+    print(f"Merged {len(rows)} fact records ({written} written, {deleted} changed or removed lines deleted)")
+
+def _write_fact_rows(conn, rows, load_method='insert', partitioned=False):
+    """Append rows to fact_orders, creating any monthly partitions they need first"""
+    if partitioned:
+        ensure_fact_partitions(conn, rows['delivery_date_id'])
+    # Bulk insert via to_sql (batches of 1000 rows) or COPY
+    _write_rows(conn, rows, 'fact_orders', load_method, method='multi', chunksize=1000)
+
+def _replace_fact_rows(conn, rows, load_method='insert', partitioned=False):
+    """Delete the orders in rows from fact_orders and insert all their lines again"""
+    order_ids = rows['order_id'].unique().tolist()
+    if len(order_ids) == 1:
+        changed_orders, params = "order_id = :order_id", {'order_id': order_ids[0]}
+    else:
+        # Use IN clause with parameterized query
+        placeholders = ','.join([f':id_{i}' for i in range(len(order_ids))])
+        params = {f'id_{i}': order_id for i, order_id in enumerate(order_ids)}
+        changed_orders = f"order_id IN ({placeholders})"
+    record_fact_changes(conn, changed_orders, params)
+    conn.execute(text(f"DELETE FROM fact_orders WHERE {changed_orders}"), params)
+    _write_fact_rows(conn, rows, load_method, partitioned)
+    record_fact_changes(conn, changed_orders, params)
+
+def _fact_months(rows):
+    """Split fact rows by YYYYMM delivery month; yields (month or None, rows)"""
+    for month, part in rows.groupby(rows['delivery_date_id'] // 100, dropna=False, sort=False):
+        yield (None if pd.isna(month) else int(month)), part
+
+def _write_swap_tables(conn, rows, load_method, months, run_id):
+    """Write rows into the detached swap table of their month, creating it on first use"""
+    for month, part in _fact_months(rows):
+        if month not in months:
+            create_swap_table(conn, month, run_id)
+            months.add(month)
+        _write_rows(conn, part, swap_table_name(month, run_id), load_method, method='multi', chunksize=1000)
+
+def _swap_reload(conn, months, run_id):
+    """Index the loaded swap tables and swap them in for the current partitions"""
+    for month in months:
+        finish_swap_table(conn, month, run_id)
+    swap_in_partitions(conn, months, run_id)
+
+def _changed_fact_rows(fact_table, run_date=None):
+    """All lines of every order with a line updated after run_date (everything when None)"""
+    if run_date is None:
+        return fact_table
+    changed_order_ids = fact_table.loc[fact_table['updated_at'] > run_date, 'order_id'].unique()
+    return fact_table[fact_table['order_id'].isin(changed_order_ids)]
+
+def load_dimension_table(engine, df, table_name, id_column, run_date=None, load_method='insert',
+                         write_mode='delete_insert'):
+    """Generic function to load dimension tables with incremental update logic
+
+    run_date=None means a full load; otherwise only rows updated after it are
+    replaced. df may already be an incremental extract, so its size is not used
+    to decide between the two. write_mode='merge' stages the changed rows and
+    upserts them on the table's primary key instead of deleting them by id.
+    """
+    _check_write_mode(write_mode)
     if run_date is not None:
         updated_records = df[df['updatedAt'] > run_date]
     else:
@@ -14,98 +179,281 @@ def load_dimension_table(engine, df, table_name, id_column, run_date=None):
     print(f"Loading {len(updated_records)} updated records to {table_name}")
     
     if len(updated_records) > 0:
+        # Remove metadata columns before inserting
+        columns_to_drop = ['updatedAt']
+        if table_name == 'dim_user':
+            columns_to_drop.append('date_of_birth_raw')
+        rows = updated_records.drop(columns=columns_to_drop, errors='ignore')
+
         with engine.begin() as conn:
+            if run_date is not None and write_mode == 'merge':
+                stage_name = _stage_rows(conn, rows, table_name, load_method)
+                key_columns = _primary_key_columns(conn, table_name) or [id_column]
+                written = _upsert_from_stage(conn, stage_name, table_name, list(rows.columns), key_columns)
+                record_dimension_changes(conn, table_name, rows[id_column].tolist())
+                print(f"Merged {len(rows)} records into {table_name} ({written} written)")
+                return len(rows)
+
             # Determine if we need a full or incremental load
-            if len(updated_records) < len(df):
+            if run_date is not None:
                 ids_to_update = tuple(updated_records[id_column].tolist())
                 if len(ids_to_update) == 1:
                     conn.execute(text(f"DELETE FROM {table_name} WHERE {id_column} = {ids_to_update[0]}"))
                 else:
                     conn.execute(text(f"DELETE FROM {table_name} WHERE {id_column} IN {ids_to_update}"))
+                record_dimension_changes(conn, table_name, ids_to_update)
             else:
                 conn.execute(text(f"TRUNCATE TABLE {table_name} CASCADE"))
-            
-            # Remove metadata columns before inserting
-            columns_to_drop = ['updatedAt']
-            if table_name == 'dim_user':
-                columns_to_drop.append('date_of_birth_raw')
-                
-            updated_records.drop(columns=columns_to_drop, errors='ignore').to_sql(
-                table_name,
-                conn,
-                if_exists='append',
-                index=False
-            )
+
+            _write_rows(conn, rows, table_name, load_method)
             
             return len(updated_records)
     return 0
 
-def load_date_dimension(engine, dim_date):
-    """Load date dimension while skipping existing dates (by primary key)"""
-    print(f"Preparing to load up to {len(dim_date)} date records")
-    if len(dim_date) > 0:
-        with engine.begin() as conn:
-            # Fetch existing keys
-            existing_ids = pd.read_sql("SELECT date_id FROM dim_date", conn)['date_id'].astype('int64')
-            # Only insert new dates
-            to_insert = dim_date[~dim_date['date_id'].isin(existing_ids)]
+def _calendar_extent(conn):
+    """(min date_id, max date_id, whether every day in between is present) of dim_date"""
+    low, high, count = conn.execute(text("SELECT MIN(date_id), MAX(date_id), COUNT(*) FROM dim_date")).one()
+    if low is None:
+        return None, None, False
+    days = (date_from_id(high) - date_from_id(low)).days + 1
+    return int(low), int(high), count == days
 
-            print(f"Loading {len(to_insert)} date records")
-            if len(to_insert) > 0:
-                to_insert.to_sql(
-                    'dim_date',
-                    conn,
-                    if_exists='append',
-                    index=False,
-                    method='multi',
-                    chunksize=500
-                )
-                print(f"Loaded {len(to_insert)} date records")
-                return len(to_insert)
-            else:
-                print("No new dates to load into dim_date.")
-                return 0
-    else:
-        print("Warning: No dates to load into dim_date!")
+def ensure_calendar(engine, dates, calendar, start=None, end=None, load_method='insert'):
+    """Extend dim_date so it covers [start, end] and every date in dates.
+
+    calendar holds the date_id range dim_date is known to cover (see
+    load_calendar_range) and is updated in place. When it is empty, the range
+    is read once with MIN/MAX; a table with holes is refilled over its whole
+    span. Only days outside the covered range are generated and written, so a
+    run whose dates are all covered touches nothing.
+    """
+    dates = pd.Series(dates).dropna()
+    wanted = [pd.Timestamp(day) for day in (start, end) if day]
+    if len(dates) > 0:
+        wanted += [dates.min(), dates.max()]
+    if not wanted:
         return 0
+    first, last = min(wanted).normalize(), max(wanted).normalize()
 
-def load_fact_table(engine, fact_table, run_date=None):
-    """Load fact table with incremental update logic"""
-    if run_date is not None:
-        updated_orders = fact_table[fact_table['updated_at'] > run_date]
-    else:
-        updated_orders = fact_table
+    with engine.begin() as conn:
+        if calendar.get('min_date_id') is None:
+            low, high, complete = _calendar_extent(conn)
+            if complete:
+                calendar['min_date_id'], calendar['max_date_id'] = low, high
+            elif low is not None:
+                # Table with holes: refill everything from its first to its last day
+                first, last = min(first, date_from_id(low)), max(last, date_from_id(high))
+
+        if calendar.get('min_date_id') is None:
+            spans = [(first, last)]
+        else:
+            covered_first, covered_last = date_from_id(calendar['min_date_id']), date_from_id(calendar['max_date_id'])
+            spans = []
+            if first < covered_first:
+                spans.append((first, covered_first - pd.Timedelta(days=1)))
+            if last > covered_last:
+                spans.append((covered_last + pd.Timedelta(days=1), last))
+            first, last = min(first, covered_first), max(last, covered_last)
+
+        written = 0
+        if spans:
+            new_days = pd.concat([calendar_range(low, high) for low, high in spans], ignore_index=True)
+            stage_name = _stage_rows(conn, new_days, 'dim_date', load_method)
+            written = _upsert_from_stage(conn, stage_name, 'dim_date', list(new_days.columns), ['date_id'])
+            print(f"Extended dim_date with {written} days")
+
+    calendar['min_date_id'] = int(first.strftime('%Y%m%d'))
+    calendar['max_date_id'] = int(last.strftime('%Y%m%d'))
+    return written
+
+def load_fact_table(engine, fact_table, run_date=None, load_method='insert', write_mode='delete_insert'):
+    """Load fact table with incremental update logic
+
+    An order with any line updated after run_date is deleted and rebuilt from
+    all of its lines in fact_table; run_date=None reloads the whole table.
+    write_mode='merge' stages the changed orders and upserts their lines by
+    fact_id instead, so unchanged lines of a partly changed order stay put.
+    When fact_orders is partitioned, a full reload builds new monthly tables
+    and swaps them in at the end instead of truncating the live table.
+    """
+    _check_write_mode(write_mode)
+    updated_orders = _changed_fact_rows(fact_table, run_date)
         
     print(f"Loading {len(updated_orders)} updated fact records")
     
     if len(updated_orders) > 0:
+        rows = updated_orders.drop(columns=['updated_at'], errors='ignore')
         with engine.begin() as conn:
-            if len(updated_orders) < len(fact_table):
-                order_ids_to_update = updated_orders['order_id'].unique().tolist()
-                if len(order_ids_to_update) == 1:
-                    conn.execute(text("DELETE FROM fact_orders WHERE order_id = :order_id"), 
-                               {'order_id': order_ids_to_update[0]})
-                else:
-                    # Use IN clause with parameterized query
-                    placeholders = ','.join([f':id_{i}' for i in range(len(order_ids_to_update))])
-                    params = {f'id_{i}': order_id for i, order_id in enumerate(order_ids_to_update)}
-                    conn.execute(text(f"DELETE FROM fact_orders WHERE order_id IN ({placeholders})"), params)
+            if run_date is not None and write_mode == 'merge':
+                _merge_fact_rows(conn, rows, load_method)
+                return len(updated_orders)
+
+            partitioned = is_partitioned(conn)
+            if run_date is not None:
+                _replace_fact_rows(conn, rows, load_method, partitioned)
+                print(f"Inserted {len(updated_orders)} fact records")
+                return len(updated_orders)
+            elif partitioned:
+                months, run_id = set(), new_swap_run()
+                _write_swap_tables(conn, rows, load_method, months, run_id)
+                _swap_reload(conn, months, run_id)
+                print(f"Inserted {len(updated_orders)} fact records")
+                return len(updated_orders)
             else:
                 conn.execute(text("TRUNCATE TABLE fact_orders"))
             
-            # Use pandas to_sql for bulk insert - it handles data types properly
-            updated_orders.drop(columns=['updated_at'], errors='ignore').to_sql(
-                'fact_orders', 
-                conn, 
-                if_exists='append', 
-                index=False,
-                method='multi',
-                chunksize=1000  # Insert in batches of 1000 rows
-            )
+            _write_fact_rows(conn, rows, load_method, partitioned)
             print(f"Inserted {len(updated_orders)} fact records")
             return len(updated_orders)
     return 0
 
+def load_fact_chunks(engine, fact_chunks, run_date=None, load_method='insert', write_mode='delete_insert'):
+    """Load fact table from an iterable of chunks in one transaction.
+
+    Every order must be contained in a single chunk (see stream_order_items),
+    so deleting and reinserting changed orders chunk by chunk stays consistent.
+    A full load into a partitioned fact_orders fills swap tables chunk by
+    chunk and swaps them in once all chunks are written.
+    """
+    _check_write_mode(write_mode)
+    total_inserted = 0
+    with engine.begin() as conn:
+        partitioned = is_partitioned(conn)
+        swap_months = set() if run_date is None and partitioned else None
+        run_id = new_swap_run()
+        if run_date is None and swap_months is None:
+            conn.execute(text("TRUNCATE TABLE fact_orders"))
+
+        for chunk in fact_chunks:
+            if run_date is None:
+                to_insert = chunk
+            elif write_mode == 'merge':
+                changed_ids = chunk.loc[chunk['updated_at'] > run_date, 'order_id'].unique()
+                to_merge = chunk[chunk['order_id'].isin(changed_ids)]
+                if len(to_merge) > 0:
+                    _merge_fact_rows(conn, to_merge.drop(columns=['updated_at'], errors='ignore'), load_method)
+                    total_inserted += len(to_merge)
+                continue
+            else:
+                changed_ids = chunk.loc[chunk['updated_at'] > run_date, 'order_id'].unique().tolist()
+                if len(changed_ids) > 0:
+                    placeholders = ','.join([f':id_{i}' for i in range(len(changed_ids))])
+                    params = {f'id_{i}': order_id for i, order_id in enumerate(changed_ids)}
+                    record_fact_changes(conn, f"order_id IN ({placeholders})", params)
+                    conn.execute(text(f"DELETE FROM fact_orders WHERE order_id IN ({placeholders})"), params)
+                to_insert = chunk[chunk['order_id'].isin(changed_ids)]
+
+            if len(to_insert) > 0:
+                rows = to_insert.drop(columns=['updated_at'], errors='ignore')
+                if swap_months is not None:
+                    _write_swap_tables(conn, rows, load_method, swap_months, run_id)
+                else:
+                    _write_fact_rows(conn, rows, load_method, partitioned)
+                    if run_date is not None:
+                        record_fact_changes(conn, f"order_id IN ({placeholders})", params)
+                total_inserted += len(to_insert)
+                print(f"Inserted {len(to_insert)} fact records (running total: {total_inserted})")
+
+        if swap_months is not None:
+            _swap_reload(conn, swap_months, run_id)
+
+    print(f"Inserted {total_inserted} fact records from chunks")
+    return total_inserted
+
+def widen_fact_id(engine):
+    """Make fact_orders.fact_id bigint if it is a narrower integer.
+
+    fact_id packs order_id << 32 | product_id, which overflows integer. Does
+    nothing once the column is bigint (or fact_orders doesn't exist).
+    """
+    with engine.begin() as conn:
+        data_type = conn.execute(text("""
+            SELECT data_type FROM information_schema.columns
+            WHERE table_schema = current_schema() AND table_name = 'fact_orders' AND column_name = 'fact_id'
+        """)).scalar()
+        if data_type not in ('smallint', 'integer'):
+            return False
+        conn.execute(text("ALTER TABLE fact_orders ALTER COLUMN fact_id TYPE bigint"))
+    print(f"Widened fact_orders.fact_id from {data_type} to bigint")
+    return True
+
+def _reload_partitions_parallel(engine, rows, load_method, workers):
+    """Rebuild every month in its own swap table concurrently, then swap them all in at once"""
+    months = dict(_fact_months(rows))
+    run_id = new_swap_run()
+
+    def write_month(month):
+        with engine.begin() as conn:
+            create_swap_table(conn, month, run_id)
+            _write_rows(conn, months[month], swap_table_name(month, run_id), load_method, method='multi', chunksize=1000)
+            finish_swap_table(conn, month, run_id)
+        return len(months[month])
+
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            written = sum(pool.map(write_month, months))
+        with engine.begin() as conn:
+            swap_in_partitions(conn, months, run_id)
+    finally:
+        with engine.begin() as conn:
+            drop_swap_tables(conn, months, run_id)
+
+    print(f"Inserted {written} fact records from {len(months)} monthly partitions")
+    return written
+
+def load_fact_parallel(engine, fact_table, run_date=None, load_method='insert', write_mode='delete_insert',
+                       workers=4):
+    """Load fact table with several connections writing into it at once.
+
+    The changed rows are split by order_id hash, so whole orders stay
+    together, and each part is written straight into fact_orders by its own
+    pooled connection and transaction (delete + insert, or stage + merge, of
+    that part's orders). Every order is replaced atomically, but readers can
+    see some parts of a load before the others. A failed part fails the run,
+    and the next run loads the same changes again from the same watermarks.
+
+    A full reload truncates fact_orders before the parts are written; when
+    fact_orders is partitioned it writes one swap table per month instead
+    and swaps them all in at once.
+    """
+    _check_write_mode(write_mode)
+    updated_orders = _changed_fact_rows(fact_table, run_date)
+    print(f"Loading {len(updated_orders)} updated fact records over {workers} connections")
+    if len(updated_orders) == 0:
+        return 0
+
+    rows = updated_orders.drop(columns=['updated_at'], errors='ignore')
+    with engine.connect() as conn:
+        partitioned = is_partitioned(conn)
+    if run_date is None and partitioned:
+        return _reload_partitions_parallel(engine, rows, load_method, workers)
+
+    with engine.begin() as conn:
+        if run_date is None:
+            conn.execute(text("TRUNCATE TABLE fact_orders"))
+        elif partitioned:
+            # Created up front, so the parts never race to create the same partition
+            ensure_fact_partitions(conn, rows['delivery_date_id'])
+
+    def write_part(part):
+        with engine.begin() as conn:
+            if run_date is None:
+                _write_rows(conn, part, 'fact_orders', load_method, method='multi', chunksize=1000)
+            elif write_mode == 'merge':
+                _merge_fact_rows(conn, part, load_method)
+            else:
+                _replace_fact_rows(conn, part, load_method)
+        return len(part)
+
+    # Whole orders stay together, so every part can be replaced independently
+    part_ids = rows['order_id'] % workers
+    parts = [part for _, part in rows.groupby(part_ids, sort=False)]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        written = sum(pool.map(write_part, parts))
+
+    print(f"Inserted {written} fact records from {len(parts)} parallel parts")
+    return written
+
 def record_etl_run(engine, timestamp=None):
     """Record the ETL run in the etl_runs table"""
     if timestamp is None:
@@ -0,0 +1,44 @@
+import json
+import os
+import numpy as np
+import pandas as pd
+
+# One dictionary per normalized attribute
+NORMALIZATION_MAPS = ['category', 'gender', 'place']
+
+def normalize_values(values, func, mapping=None):
+    """Normalize a Series by calling func once per distinct value.
+
+    Distinct values missing from mapping are normalized and added to it in
+    place; every row is then filled with a vectorized lookup. Missing input
+    values come out as None.
+    """
+    if mapping is None:
+        mapping = {}
+
+    codes, uniques = pd.factorize(values)
+    for value in uniques:
+        if value not in mapping:
+            mapping[value] = func(value)
+
+    # The trailing None is what code -1 (missing input) picks up
+    lookup = np.array([mapping[value] for value in uniques] + [None], dtype=object)
+    return pd.Series(lookup[codes], index=values.index)
+
+def new_normalization_maps():
+    """Empty dictionaries for every normalized attribute"""
+    return {name: {} for name in NORMALIZATION_MAPS}
+
+def load_normalization_maps(path):
+    """Load persisted raw -> canonical dictionaries (empty if the file doesn't exist)"""
+    maps = new_normalization_maps()
+    if path and os.path.exists(path):
+        with open(path) as f:
+            maps.update(json.load(f))
+    return maps
+
+def save_normalization_maps(path, maps):
+    """Persist the dictionaries so known values skip normalization next run"""
+    with open(path, 'w') as f:
+        json.dump(maps, f)
+    print(f"Saved {sum(len(mapping) for mapping in maps.values())} normalized values to {path}")
\ No newline at end of file
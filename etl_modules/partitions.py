@@ -0,0 +1,161 @@
+import re
+import uuid
+import pandas as pd
+from sqlalchemy import text
+
+# fact_orders is range-partitioned by month of delivery_date_id (YYYYMMDD);
+# orders without a delivery date land in the default partition
+FACT_TABLE = 'fact_orders'
+DEFAULT_PARTITION = f"{FACT_TABLE}_pdefault"
+
+def partition_name(month):
+    """Partition holding one YYYYMM month (None = the default partition)"""
+    return DEFAULT_PARTITION if month is None else f"{FACT_TABLE}_p{int(month)}"
+
+def month_bounds(month):
+    """[low, high) delivery_date_id bounds of a YYYYMM month"""
+    year, month = divmod(int(month), 100)
+    next_month = (year + 1) * 100 + 1 if month == 12 else year * 100 + month + 1
+    return (year * 100 + month) * 100 + 1, next_month * 100 + 1
+
+def months_of(date_ids):
+    """Distinct YYYYMM months of a delivery_date_id Series (None for missing dates)"""
+    months = (pd.Series(date_ids).astype('Int64') // 100).drop_duplicates()
+    return [None if pd.isna(month) else int(month) for month in months]
+
+def _bound_sql(month):
+    if month is None:
+        return 'DEFAULT'
+    low, high = month_bounds(month)
+    return f"FOR VALUES FROM ({low}) TO ({high})"
+
+def _bound_check(month):
+    if month is None:
+        return "delivery_date_id IS NULL"
+    low, high = month_bounds(month)
+    return f"delivery_date_id IS NOT NULL AND delivery_date_id >= {low} AND delivery_date_id < {high}"
+
+def is_partitioned(conn, table_name=FACT_TABLE):
+    """True when table_name is a partitioned table"""
+    relkind = conn.execute(text("SELECT relkind FROM pg_class WHERE oid = to_regclass(:t)"), {'t': table_name}).scalar()
+    return relkind == 'p'
+
+def existing_partitions(conn, table_name=FACT_TABLE):
+    """Names of the partitions currently attached to table_name"""
+    return set(conn.execute(text("""
+        SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = to_regclass(:t)
+    """), {'t': table_name}).scalars())
+
+def ensure_fact_partitions(conn, date_ids):
+    """Create the monthly partitions the given delivery_date_ids need (and the default one)"""
+    existing = existing_partitions(conn)
+    created = 0
+    for month in months_of(date_ids) + [None]:
+        name = partition_name(month)
+        if name not in existing:
+            conn.execute(text(f"CREATE TABLE {name} PARTITION OF {FACT_TABLE} {_bound_sql(month)}"))
+            existing.add(name)
+            created += 1
+    if created:
+        print(f"Created {created} {FACT_TABLE} partitions")
+    return created
+
+def _partition_index_sql(conn):
+    """CREATE INDEX statements (without a table) for every index on the partitioned fact table"""
+    indexdefs = conn.execute(text(
+        "SELECT indexdef FROM pg_indexes WHERE schemaname = current_schema() AND tablename = :t"
+    ), {'t': FACT_TABLE}).scalars()
+    # 'CREATE INDEX name ON ONLY public.fact_orders USING btree (col)' -> 'CREATE INDEX ON {} USING btree (col)'
+    return [re.sub(r'^CREATE (UNIQUE )?INDEX \S+ ON ONLY \S+', r'CREATE \1INDEX ON {}', indexdef) for indexdef in indexdefs]
+
+def partition_fact_table(engine):
+    """Convert a plain fact_orders table into a monthly range-partitioned one.
+
+    Runs in one transaction: the old table is renamed, its rows are copied
+    into the new partitions and it is dropped. Does nothing if fact_orders is
+    already partitioned.
+    """
+    with engine.begin() as conn:
+        if is_partitioned(conn):
+            return False
+        old_name = f"{FACT_TABLE}_unpartitioned"
+        conn.execute(text(f"ALTER TABLE {FACT_TABLE} RENAME TO {old_name}"))
+        conn.execute(text(
+            f"CREATE TABLE {FACT_TABLE} (LIKE {old_name} INCLUDING DEFAULTS) PARTITION BY RANGE (delivery_date_id)"
+        ))
+        # fact_id alone can't be unique across partitions; merges match on these indexes instead
+        conn.execute(text(f"CREATE INDEX ON {FACT_TABLE} (fact_id)"))
+        conn.execute(text(f"CREATE INDEX ON {FACT_TABLE} (order_id)"))
+        date_ids = pd.read_sql(f"SELECT DISTINCT delivery_date_id FROM {old_name}", conn)['delivery_date_id']
+        ensure_fact_partitions(conn, date_ids)
+        moved = conn.execute(text(f"INSERT INTO {FACT_TABLE} SELECT * FROM {old_name}")).rowcount
+        conn.execute(text(f"DROP TABLE {old_name}"))
+    print(f"Partitioned {FACT_TABLE} by month ({moved} rows moved)")
+    return True
+
+def new_swap_run():
+    """Id naming one reload's swap tables, so overlapping reloads never share them"""
+    return uuid.uuid4().hex[:8]
+
+def swap_table_name(month, run_id):
+    """Table a month is rebuilt in by reload run_id before being swapped in"""
+    return f"{partition_name(month)}_new_{run_id}"
+
+def create_swap_table(conn, month, run_id):
+    """Create the empty, detached table a month's rows are reloaded into"""
+    name = swap_table_name(month, run_id)
+    conn.execute(text(f"CREATE TABLE {name} (LIKE {FACT_TABLE} INCLUDING DEFAULTS)"))
+    return name
+
+def finish_swap_table(conn, month, run_id):
+    """Index a loaded swap table and add its bound as a CHECK, so ATTACH needs no rebuild or scan"""
+    name = swap_table_name(month, run_id)
+    for index_sql in _partition_index_sql(conn):
+        conn.execute(text(index_sql.format(name)))
+    conn.execute(text(f"ALTER TABLE {name} ADD CONSTRAINT {name}_bound CHECK ({_bound_check(month)})"))
+
+def _rename_swap_indexes(conn, month, run_id):
+    """Give a swapped-in partition's indexes the names the partition itself would use"""
+    name, swap_name = partition_name(month), swap_table_name(month, run_id)
+    index_names = conn.execute(text(
+        "SELECT indexname FROM pg_indexes WHERE schemaname = current_schema() AND tablename = :t"
+    ), {'t': name}).scalars().all()
+    for index_name in index_names:
+        if index_name.startswith(swap_name):
+            conn.execute(text(f"ALTER INDEX {index_name} RENAME TO {name + index_name[len(swap_name):]}"))
+
+def swap_in_partitions(conn, months, run_id):
+    """Replace every fact partition with the loaded swap tables of the given months.
+
+    Partitions without a swap table are dropped, since a full reload replaces
+    everything. The default partition is detached first and attached last so
+    attaching months never has to scan it. Overlapping reloads swap one
+    after the other: the fact table is locked before its partitions are read.
+    """
+    conn.execute(text(f"LOCK TABLE {FACT_TABLE} IN ACCESS EXCLUSIVE MODE"))
+    months = list(months)
+    if None not in months:
+        create_swap_table(conn, None, run_id)
+        finish_swap_table(conn, None, run_id)
+        months.append(None)
+
+    existing = existing_partitions(conn)
+    if DEFAULT_PARTITION in existing:
+        conn.execute(text(f"ALTER TABLE {FACT_TABLE} DETACH PARTITION {DEFAULT_PARTITION}"))
+    for name in existing - {DEFAULT_PARTITION}:
+        conn.execute(text(f"ALTER TABLE {FACT_TABLE} DETACH PARTITION {name}"))
+
+    for name in existing:
+        conn.execute(text(f"DROP TABLE {name}"))
+    for month in sorted(months, key=lambda m: (m is None, m or 0)):
+        name = partition_name(month)
+        conn.execute(text(f"ALTER TABLE {swap_table_name(month, run_id)} RENAME TO {name}"))
+        _rename_swap_indexes(conn, month, run_id)
+        conn.execute(text(f"ALTER TABLE {FACT_TABLE} ATTACH PARTITION {name} {_bound_sql(month)}"))
+    print(f"Swapped in {len(months)} {FACT_TABLE} partitions (replaced {len(existing)})")
+
+def drop_swap_tables(conn, months, run_id):
+    """Remove the swap tables a failed reload left behind"""
+    for month in list(months) + [None]:
+        conn.execute(text(f"DROP TABLE IF EXISTS {swap_table_name(month, run_id)}"))
@@ -0,0 +1,84 @@
+import json
+import os
+import shutil
+from datetime import datetime
+import pandas as pd
+
+from .extract import _apply_source_dtypes
+
+# Order matches the tuple returned by extract_source_tables
+STAGED_TABLES = ['Orders', 'OrderItems', 'Products', 'Users', 'Riders', 'Couriers']
+MANIFEST_FILE = 'manifest.json'
+
+def _snapshot_tag(watermark):
+    """Directory-safe tag for an extraction watermark (None = full extract)"""
+    if watermark is None:
+        return 'full'
+    watermark = pd.Timestamp(watermark)
+    if watermark.tzinfo is None:
+        watermark = watermark.tz_localize('UTC')
+    return watermark.tz_convert('UTC').strftime('%Y%m%dT%H%M%S%fZ')
+
+def write_staging_snapshot(staging_dir, frames, watermark=None, extracted_at=None, keep=3):
+    """Write extracted frames as Parquet files tagged with the extraction watermark.
+
+    The manifest is written last, so a snapshot without one is incomplete and
+    never reused. Only the newest `keep` snapshots are kept on disk.
+    """
+    if extracted_at is None:
+        extracted_at = datetime.now()
+
+    path = os.path.join(staging_dir, f"snapshot_{_snapshot_tag(watermark)}_{extracted_at.strftime('%Y%m%dT%H%M%S')}")
+    os.makedirs(path, exist_ok=True)
+    for name in STAGED_TABLES:
+        frames[name].to_parquet(os.path.join(path, f"{name}.parquet"), index=False)
+
+    manifest = {
+        'watermark': None if watermark is None else pd.Timestamp(watermark).isoformat(),
+        'extracted_at': extracted_at.isoformat(),
+        'tables': {name: len(frames[name]) for name in STAGED_TABLES},
+    }
+    with open(os.path.join(path, MANIFEST_FILE), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    print(f"Staged {sum(manifest['tables'].values())} rows to {path}")
+
+    prune_staging_snapshots(staging_dir, keep)
+    return path
+
+def _complete_snapshots(staging_dir):
+    """Return (path, manifest) for every complete snapshot, newest first"""
+    if not os.path.isdir(staging_dir):
+        return []
+    snapshots = []
+    for entry in os.listdir(staging_dir):
+        manifest_path = os.path.join(staging_dir, entry, MANIFEST_FILE)
+        if entry.startswith('snapshot_') and os.path.exists(manifest_path):
+            with open(manifest_path) as f:
+                snapshots.append((os.path.join(staging_dir, entry), json.load(f)))
+    return sorted(snapshots, key=lambda item: item[1]['extracted_at'], reverse=True)
+
+def find_staging_snapshot(staging_dir, watermark=None):
+    """Return the newest complete snapshot extracted from the given watermark, or None"""
+    wanted = None if watermark is None else pd.Timestamp(watermark)
+    for path, manifest in _complete_snapshots(staging_dir):
+        staged = None if manifest['watermark'] is None else pd.Timestamp(manifest['watermark'])
+        if staged == wanted:
+            return path
+    return None
+
+def read_staging_snapshot(path):
+    """Load a snapshot back into frames; returns (frames, extraction timestamp)"""
+    with open(os.path.join(path, MANIFEST_FILE)) as f:
+        manifest = json.load(f)
+    # Parquet keeps the dtypes but not the string storage, so reapply the source schema
+    frames = {
+        name: _apply_source_dtypes(pd.read_parquet(os.path.join(path, f"{name}.parquet")), name)
+        for name in STAGED_TABLES
+    }
+    print(f"Read {sum(len(df) for df in frames.values())} staged rows from {path}")
+    return frames, datetime.fromisoformat(manifest['extracted_at'])
+
+def prune_staging_snapshots(staging_dir, keep=3):
+    """Delete all but the newest `keep` complete snapshots"""
+    for path, _ in _complete_snapshots(staging_dir)[keep:]:
+        shutil.rmtree(path, ignore_errors=True)
\ No newline at end of file
@@ -1,5 +1,8 @@
 import pandas as pd
 
+from .dates import parse_dates, date_ids_from_dates
+from .normalize import normalize_values, new_normalization_maps
+
 def _singularize_simple(token: str) -> str:
     t = token
     if t.endswith('ies') and len(t) > 3:
@@ -16,56 +19,69 @@ def _normalize_gender(value):
     if pd.isna(value):
         return None
     s = str(value).strip().lower()
-    if s in ('F', 'Female'):
+    if s in ('f', 'female'):
         return 'F'
-    if s in ('M', 'Male'):
+    if s in ('m', 'male'):
         return 'M'
     return None
 
-def transform_product_dimension(products_df):
+def _normalize_category(value):
+    # 'Batteries ' -> 'battery', 'Home Goods' -> 'homegood'
+    if pd.isna(value):
+        return None
+    token = ''.join(str(value).split()).lower()
+    return _singularize_simple(token) if token else None
+
+def _normalize_place(value):
+    # trim and collapse inner whitespace of city/country names
+    if pd.isna(value):
+        return None
+    name = ' '.join(str(value).split())
+    return name if name else None
+
+# fact_id packs order_id into the high 32 bits and product_id into the low 32,
+# so an order line keeps the same key on every run
+FACT_KEY_SHIFT = 32
+
+def fact_keys(order_ids, product_ids):
+    """Deterministic fact_id for each (order_id, product_id) order line"""
+    return order_ids.astype('int64') * (1 << FACT_KEY_SHIFT) + product_ids.fillna(0).astype('int64')
+
+def _compact_frame(df, categorical=(), integers=()):
+    """Store low-cardinality labels as categoricals and ids in the smallest safe integer type"""
+    for column in categorical:
+        df[column] = df[column].astype('category')
+    for column in integers:
+        # downcast keeps nullable ints nullable (Int64 -> Int8/Int16/Int32)
+        df[column] = pd.to_numeric(df[column], downcast='integer')
+    return df
+
+def transform_product_dimension(products_df, norm_maps=None):
     """Transform product data into dim_product table"""
+    norm_maps = norm_maps if norm_maps is not None else new_normalization_maps()
     dim_product = products_df[['id', 'name', 'category', 'price', 'updatedAt']].copy()
     dim_product = dim_product.rename(columns={'id': 'product_id', 'name': 'name', 'price': 'current_price'})
-    # normalize category
-    cat = dim_product['category'].astype('string')
-    cat = cat.str.strip().str.lower().str.replace(r'\s+', '', regex=True)
-    dim_product['category'] = cat.fillna('').map(lambda x: _singularize_simple(x) if isinstance(x, str) else x).replace({'': None})
+    # normalize category (once per distinct raw value)
+    dim_product['category'] = normalize_values(dim_product['category'], _normalize_category, norm_maps['category'])
+    dim_product = _compact_frame(dim_product, categorical=['category'], integers=['product_id'])
     dim_product = dim_product.drop_duplicates(subset=['product_id'])
     dim_product['updatedAt'] = pd.to_datetime(dim_product['updatedAt'], utc=True)
     return dim_product
 
-def transform_user_dimension(users_df):
+def transform_user_dimension(users_df, date_cache=None, norm_maps=None):
     """Transform user data into dim_user table"""
+    norm_maps = norm_maps if norm_maps is not None else new_normalization_maps()
     dim_user = users_df[['id', 'city', 'country', 'gender', 'dateOfBirth', 'updatedAt']].copy()
     dim_user = dim_user.rename(columns={'id': 'user_id', 'dateOfBirth': 'date_of_birth_raw'})
-    # Normalize gender to 'F' or 'M'
-    dim_user['gender'] = dim_user['gender'].apply(_normalize_gender)
+    # Normalize gender to 'F' or 'M' and tidy place names (once per distinct raw value)
+    dim_user['gender'] = normalize_values(dim_user['gender'], _normalize_gender, norm_maps['gender'])
+    dim_user['city'] = normalize_values(dim_user['city'], _normalize_place, norm_maps['place'])
+    dim_user['country'] = normalize_values(dim_user['country'], _normalize_place, norm_maps['place'])
+    dim_user = _compact_frame(dim_user, categorical=['gender', 'city', 'country'], integers=['user_id'])
     dim_user = dim_user.drop_duplicates(subset=['user_id'])
 
-    # Parse date_of_birth with multiple formats
-    dim_user['date_of_birth_raw'] = dim_user['date_of_birth_raw'].astype(str).str.strip().replace({'nan': None})
-    s = dim_user['date_of_birth_raw']
-
-    # known formats (iso is y-m-d, mdy is m/d/y)
-    mask_iso = s.str.match(r'^\d{4}-\d{2}-\d{2}$', na=False) 
-    mask_mdy = s.str.match(r'^\d{1,2}/\d{1,2}/\d{4}$', na=False)
-
-    # Prepare an empty Series of dtype datetime64[ns]
-    parsed = pd.Series(pd.NaT, index=s.index, dtype='datetime64[ns]')
-
-    # Parse slices with explicit formats (fast + strict)
-    if mask_iso.any():
-        parsed.loc[mask_iso] = pd.to_datetime(s.loc[mask_iso], format='%Y-%m-%d', errors='coerce')
-    if mask_mdy.any():
-        parsed.loc[mask_mdy] = pd.to_datetime(s.loc[mask_mdy], format='%m/%d/%Y', errors='coerce')
-
-    # Fallback: try pandas generic parser for any remaining non-null strings
-    remaining = parsed.isna() & s.notna()
-    if remaining.any():
-        parsed.loc[remaining] = pd.to_datetime(s.loc[remaining], errors='coerce', infer_datetime_format=True)
-
-    # Final column as python date (no timezone — DOB is a date)
-    dim_user['date_of_birth'] = parsed.dt.date
+    # Parse date_of_birth (each distinct raw string once); final column as python date
+    dim_user['date_of_birth'] = parse_dates(dim_user['date_of_birth_raw'], date_cache).dt.date
 
     # Ensure updatedAt is UTC-aware for comparison
     dim_user['updatedAt'] = pd.to_datetime(dim_user['updatedAt'], utc=True)
@@ -81,9 +97,11 @@ def transform_rider_dimension(riders_df, couriers_df):
         'courierId': 'courier_id', 
         'updatedAt': 'rider_updatedAt'
     })
+    riders_table = _compact_frame(riders_table, categorical=['vehicle_type', 'gender'], integers=['rider_id'])
     
     couriers_table = couriers_df[['id', 'courier_name', 'updatedAt']].copy()
     couriers_table = couriers_table.rename(columns={'id': 'courier_id', 'updatedAt': 'courier_updatedAt'})
+    couriers_table = _compact_frame(couriers_table, categorical=['courier_name'])
 
     # Merge riders and couriers table to one dimension table
     dim_rider = riders_table.merge(couriers_table, on='courier_id', how='left')
@@ -99,56 +117,28 @@ def transform_rider_dimension(riders_df, couriers_df):
     
     return dim_rider
 
-def transform_date_dimension(orders_df):
-    """Transform delivery dates into dim_date table"""
-    s = orders_df['deliveryDate']
-
-    # Normalize to strings and strip whitespace
-    s_str = s.astype(str).str.strip().replace({'nan': None, 'NaT': None, 'None': None, '': None})
-
-    # Prepare a UTC-aware Series
-    parsed = pd.Series(pd.NaT, index=s_str.index, dtype='datetime64[ns, UTC]')
-
-    # Only two known formats: YYYY-MM-DD and MM/DD/YYYY
-    mask_iso = s_str.str.match(r'^\d{4}-\d{2}-\d{2}$', na=False)
-    mask_mdy = s_str.str.match(r'^\d{1,2}/\d{1,2}/\d{4}$', na=False)
-
-    if mask_iso.any():
-        parsed.loc[mask_iso] = pd.to_datetime(
-            s_str.loc[mask_iso], format='%Y-%m-%d', errors='coerce', utc=True
-        )
-    if mask_mdy.any():
-        parsed.loc[mask_mdy] = pd.to_datetime(
-            s_str.loc[mask_mdy], format='%m/%d/%Y', errors='coerce', utc=True
-        )
-
-    # Generic fallback for remaining values (handles e.g. "YYYY-MM-DD HH:MM:SS")
-    remaining = parsed.isna() & s_str.notna()
-    if remaining.any():
-        parsed.loc[remaining] = pd.to_datetime(s_str.loc[remaining], errors='coerce', utc=True)
-
-    # Distinct calendar days present in Orders
-    dates_only = parsed.dropna().dt.date
-    unique_dates = pd.Series(dates_only, dtype='object').drop_duplicates().sort_values()
-    date_series = pd.to_datetime(unique_dates)
-
-    dim_date = pd.DataFrame({
-        'date_id': date_series.dt.strftime('%Y%m%d').astype('int64'),
-        'year': date_series.dt.year.astype('int16'),
-        'quarter': date_series.dt.quarter.astype('int16'),
-        'month': date_series.dt.month.astype('int16'),
-        'day': date_series.dt.day.astype('int16'),
-        'day_of_week': date_series.dt.dayofweek.astype('int16'),
-        'is_weekend': date_series.dt.dayofweek.isin([5, 6]).astype('bool'),
-    })
-
-    # Return parsed delivery datetimes to keep the existing function signature
-    return dim_date, parsed
+def parse_delivery_dates(orders_df, date_cache=None):
+    """Parsed delivery date of every order (aligned with orders_df) for transform_fact_table"""
+    return parse_dates(orders_df['deliveryDate'], date_cache)
 
 def transform_fact_table(order_items_df, orders_df, products_df, parsed_delivery_dates):
-    """Transform data into fact_orders table"""
-    orders_df = orders_df.rename(columns={'id':'order_id', 'updatedAt': 'orders_updated_at'})
-    order_items_df = order_items_df.rename(columns={'OrderId':'order_id','updatedAt': 'order_items_updated_at'})
+    """Transform data into fact_orders table
+
+    fact_id is derived from (order_id, product_id), so the same order line
+    gets the same key in every run and in every chunk.
+    """
+    # Keep only the columns the fact table needs, with compact integer keys, before merging
+    orders_df = orders_df[['id', 'userId', 'deliveryRiderId', 'updatedAt']].rename(
+        columns={'id':'order_id', 'updatedAt': 'orders_updated_at'}
+    )
+    # Delivery dates were already parsed per order by parse_delivery_dates
+    orders_df['delivery_date'] = date_ids_from_dates(parsed_delivery_dates)
+    orders_df = _compact_frame(orders_df, integers=['userId', 'deliveryRiderId', 'delivery_date'])
+
+    order_items_df = order_items_df[['OrderId', 'ProductId', 'quantity', 'updatedAt']].rename(
+        columns={'OrderId':'order_id','updatedAt': 'order_items_updated_at'}
+    )
+    order_items_df = _compact_frame(order_items_df, integers=['ProductId', 'quantity'])
 
     # Join order_items with orders to get all needed columns
     fact_orders = order_items_df.merge(
@@ -171,16 +161,19 @@ def transform_fact_table(order_items_df, orders_df, products_df, parsed_delivery
     fact_orders['order_items_updated_at'] = pd.to_datetime(fact_orders['order_items_updated_at'], errors='coerce', utc=True)
     fact_orders['most_recent_updated_at'] = fact_orders[['orders_updated_at', 'order_items_updated_at']].max(axis=1)
 
-    # Convert delivery date to match the date_id format in dim_date
-    fact_orders['delivery_date'] = pd.to_datetime(fact_orders['deliveryDate'], errors='coerce', utc=True).dt.date
-    fact_orders['delivery_date'] = fact_orders['delivery_date'].map(lambda d: int(d.strftime('%Y%m%d')) if pd.notnull(d) else None)
-
     # Calculate total_price
     fact_orders['unit_price'] = fact_orders['price']
     fact_orders['total_price'] = fact_orders['quantity'] * fact_orders['unit_price']
 
-    # Create fact_id as a simple auto-increment
-    fact_orders['fact_id'] = range(1, len(fact_orders) + 1)
+    # Stable surrogate key per order line; repeated lines of a product are summed into one
+    fact_orders['fact_id'] = fact_keys(fact_orders['order_id'], fact_orders['ProductId'])
+    if fact_orders['fact_id'].duplicated().any():
+        fact_orders = fact_orders.groupby('fact_id', as_index=False, sort=False, observed=True).agg({
+            **{column: 'first' for column in fact_orders.columns if column != 'fact_id'},
+            'quantity': 'sum',
+            'total_price': 'sum',
+            'most_recent_updated_at': 'max',
+        })
 
     # Select columns to keep and rename to match fact table schema
     fact_orders_final = fact_orders[[
@@ -207,6 +200,7 @@ def transform_fact_table(order_items_df, orders_df, products_df, parsed_delivery
     fact_orders_final['order_id'] = fact_orders_final['order_id'].astype('int64')
     fact_orders_final['product_id'] = fact_orders_final['product_id'].astype('int32')
     fact_orders_final['user_id'] = fact_orders_final['user_id'].astype('int32')
+    fact_orders_final['delivery_date_id'] = fact_orders_final['delivery_date_id'].astype('Int64')
     fact_orders_final['rider_id'] = fact_orders_final['rider_id'].fillna(-1).astype('int32')
     fact_orders_final['quantity'] = fact_orders_final['quantity'].fillna(0).astype('int32')
     fact_orders_final['unit_price'] = fact_orders_final['unit_price'].fillna(0).astype('float')
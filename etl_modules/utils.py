@@ -26,6 +26,45 @@ def load_env_variables():
     
     return mysql_conn_str, supabase_conn_str_optimized
 
+def load_etl_settings():
+    """Load optional ETL tuning settings from environment variables"""
+    load_dotenv()
+    return {
+        # Rows per chunk for the streaming extract/load path (0 = read whole tables)
+        'stream_chunksize': int(os.environ.get("ETL_STREAM_CHUNKSIZE", "0") or 0),
+        # Source tables read concurrently, one pooled connection each (1 = sequential)
+        'extract_workers': int(os.environ.get("ETL_EXTRACT_WORKERS", "1") or 1),
+        # Key ranges Orders/OrderItems are split into for parallel reads (1 = whole table)
+        'extract_partitions': int(os.environ.get("ETL_EXTRACT_PARTITIONS", "1") or 1),
+        # Directory for Parquet snapshots of each extraction (empty = no staging)
+        'staging_dir': os.environ.get("ETL_STAGING_DIR", ""),
+        # Reuse a staged snapshot taken from the same watermark instead of re-extracting
+        'staging_reuse': os.environ.get("ETL_STAGING_REUSE", "false").lower() == 'true',
+        # JSON file remembering parsed date strings across runs (empty = per-run cache only)
+        'date_cache_path': os.environ.get("ETL_DATE_CACHE", ""),
+        # JSON file with the category/gender/place normalization dictionaries (empty = per-run only)
+        'normalization_cache_path': os.environ.get("ETL_NORMALIZATION_CACHE", ""),
+        # Warehouse tables loaded with COPY FROM STDIN instead of to_sql inserts
+        'copy_tables': [t.strip() for t in os.environ.get("ETL_COPY_TABLES", "").split(",") if t.strip()],
+        # Incremental write mode: 'delete_insert' or 'merge' (staging table + upsert)
+        'write_mode': os.environ.get("ETL_WRITE_MODE", "delete_insert"),
+        # Connections the fact table is loaded over (1 = single transaction on one connection)
+        'load_workers': int(os.environ.get("ETL_LOAD_WORKERS", "1") or 1),
+        # Days dim_date is pre-filled with, e.g. 2020-01-01 .. 2030-12-31 (empty = only days orders need)
+        'calendar_start': os.environ.get("ETL_CALENDAR_START", ""),
+        'calendar_end': os.environ.get("ETL_CALENDAR_END", ""),
+        # JSON file remembering the date_id range dim_date covers (empty = MIN/MAX lookup each run)
+        'calendar_cache_path': os.environ.get("ETL_CALENDAR_CACHE", ""),
+        # Manage fact_orders as monthly partitions of delivery_date_id (converted on first run)
+        'partition_facts': os.environ.get("ETL_PARTITION_FACTS", "false").lower() == 'true',
+        # Fact rows from which secondary indexes are dropped and rebuilt instead of maintained
+        'index_rebuild_rows': int(os.environ.get("ETL_INDEX_REBUILD_ROWS", "100000") or 100000),
+        # Pipeline stages (connections, transforms, loads) run concurrently once their inputs are ready
+        'stage_workers': int(os.environ.get("ETL_STAGE_WORKERS", "4") or 4),
+        # Seconds between incremental cycles when the runner is started with --daemon
+        'daemon_interval': float(os.environ.get("ETL_DAEMON_INTERVAL", "30") or 30),
+    }
+
 def create_robust_engine(conn_str, retries=5, delay=5, pool_size=5, max_overflow=10, name=None):
     """database engine + connection retry logic"""
     # print database
@@ -0,0 +1,147 @@
+import pandas as pd
+from sqlalchemy import text
+
+from .extract import SOURCE_TABLES, source_dependencies
+
+# Per source table: the newest updatedAt (held back by WATERMARK_LAG) and the
+# highest key actually seen in extracted data, plus the row count probed at
+# the start of the run. Each table's next incremental read starts from its own
+# watermark rather than one ETL-host timestamp shared by every table, and the
+# probe compares against all three to skip tables (or whole runs) with nothing new.
+WATERMARK_TABLE = 'etl_watermarks'
+
+# updatedAt has whole-second precision, so a row can still be written in the
+# second of the newest updatedAt a read saw. A watermark therefore never moves
+# past the probe's source time minus this lag: rows near the edge are read
+# again next run (the loads are idempotent) until their second is settled.
+WATERMARK_LAG = pd.Timedelta(seconds=2)
+
+WATERMARK_DDL = f"""
+CREATE TABLE IF NOT EXISTS {WATERMARK_TABLE} (
+    table_name text PRIMARY KEY,
+    max_updated_at timestamp,
+    max_id bigint,
+    row_count bigint,
+    recorded_at timestamptz NOT NULL DEFAULT now()
+)
+"""
+
+def ensure_watermark_table(engine):
+    """Create the watermark table if it doesn't exist"""
+    with engine.begin() as conn:
+        conn.execute(text(WATERMARK_DDL))
+        conn.execute(text(f"ALTER TABLE {WATERMARK_TABLE} ADD COLUMN IF NOT EXISTS row_count bigint"))
+
+def get_watermarks(engine):
+    """{source table: {'max_updated_at': UTC Timestamp, 'max_id': int, 'row_count': int}} as of the last successful run"""
+    rows = pd.read_sql(f"SELECT table_name, max_updated_at, max_id, row_count FROM {WATERMARK_TABLE}", engine)
+    watermarks = {}
+    for row in rows.itertuples(index=False):
+        watermarks[row.table_name] = {
+            'max_updated_at': None if pd.isna(row.max_updated_at) else pd.Timestamp(row.max_updated_at).tz_localize('UTC'),
+            'max_id': None if pd.isna(row.max_id) else int(row.max_id),
+            'row_count': None if pd.isna(row.row_count) else int(row.row_count),
+        }
+    return watermarks
+
+def incremental_since(watermarks, run_date):
+    """Per-table extraction watermarks (None for a full load).
+
+    Tables without a recorded watermark yet fall back to the last run date.
+    """
+    if run_date is None:
+        return None
+    return {
+        name: watermarks.get(name, {}).get('max_updated_at') or run_date
+        for name in SOURCE_TABLES
+    }
+
+def table_since(since, table_names):
+    """Watermark a load of rows built from table_names compares against: the oldest of theirs"""
+    if since is None:
+        return None
+    return min(since[name] for name in table_names)
+
+def changed_tables(probe, watermarks):
+    """Source tables whose probe shows rows added, removed or updated since their watermark.
+
+    The updatedAt watermark is held back by WATERMARK_LAG, so a row updated
+    in the last second a run read still compares newer than it.
+    """
+    changed = set()
+    for name, seen in probe.items():
+        mark = watermarks.get(name)
+        if mark is None or mark.get('row_count') is None:
+            changed.add(name)
+        elif seen['row_count'] != mark['row_count'] or seen['max_id'] != mark['max_id']:
+            changed.add(name)
+        elif seen['max_updated_at'] is not None and (
+            mark['max_updated_at'] is None or seen['max_updated_at'] > mark['max_updated_at']
+        ):
+            changed.add(name)
+    return changed
+
+def unchanged_reads(changed):
+    """Source tables an incremental run needn't read: nothing their filters depend on changed"""
+    return {name for name in SOURCE_TABLES if not source_dependencies(name) & set(changed)}
+
+def apply_probe(watermarks, probe, lag=WATERMARK_LAG):
+    """Take the probed row counts and keys as the state the next probe compares against (in place).
+
+    Apply before observing the run's rows, so keys read after the probe
+    still raise max_id, and the observed updatedAt is held to the probe's
+    source time minus lag.
+    """
+    for name, seen in probe.items():
+        current = watermarks.get(name, {'max_updated_at': None})
+        settled_before = None if seen.get('probed_at') is None else seen['probed_at'] - lag
+        watermarks[name] = dict(
+            current, max_id=seen['max_id'], row_count=seen['row_count'], settled_before=settled_before
+        )
+    return watermarks
+
+def observe_watermarks(watermarks, table_name, df):
+    """Raise table_name's watermark to the newest updatedAt and highest key in df (in place).
+
+    The updatedAt watermark stops at the settled time set by apply_probe.
+    """
+    if df is None or len(df) == 0:
+        return watermarks
+    current = watermarks.get(table_name, {'max_updated_at': None, 'max_id': None})
+    seen_at = pd.to_datetime(df['updatedAt'], errors='coerce', utc=True).max()
+    if not pd.isna(seen_at) and current.get('settled_before') is not None:
+        seen_at = min(seen_at, current['settled_before'])
+    seen_id = pd.to_numeric(df[SOURCE_TABLES[table_name]['key']], errors='coerce').max()
+    max_updated_at, max_id = current['max_updated_at'], current['max_id']
+    if not pd.isna(seen_at) and (max_updated_at is None or seen_at > max_updated_at):
+        max_updated_at = seen_at
+    if not pd.isna(seen_id) and (max_id is None or seen_id > max_id):
+        max_id = int(seen_id)
+    watermarks[table_name] = dict(current, max_updated_at=max_updated_at, max_id=max_id)
+    return watermarks
+
+def record_watermarks(engine, watermarks):
+    """Store the watermarks of a successful run"""
+    rows = [
+        {
+            'table_name': name,
+            'max_updated_at': None if mark['max_updated_at'] is None
+            else mark['max_updated_at'].tz_convert('UTC').tz_localize(None).to_pydatetime(),
+            'max_id': mark['max_id'],
+            'row_count': mark.get('row_count'),
+        }
+        for name, mark in watermarks.items()
+    ]
+    if not rows:
+        return
+    with engine.begin() as conn:
+        conn.execute(text(f"""
+            INSERT INTO {WATERMARK_TABLE} (table_name, max_updated_at, max_id, row_count)
+            VALUES (:table_name, :max_updated_at, :max_id, :row_count)
+            ON CONFLICT (table_name) DO UPDATE SET
+                max_updated_at = EXCLUDED.max_updated_at,
+                max_id = EXCLUDED.max_id,
+                row_count = EXCLUDED.row_count,
+                recorded_at = now()
+        """), rows)
+    print(f"Recorded watermarks for {', '.join(sorted(watermarks))}")
@@ -0,0 +1,54 @@
+import threading
+
+import pytest
+
+from etl_modules.dag import SkipRemaining, run_stages, stage_order
+
+def test_run_stages_passes_dependency_results():
+    stages = {
+        'a': (lambda inputs: 1, []),
+        'b': (lambda inputs: inputs['a'] + 1, ['a']),
+        'c': (lambda inputs: inputs['a'] + inputs['b'], ['a', 'b']),
+    }
+    assert run_stages(stages, max_workers=2) == {'a': 1, 'b': 2, 'c': 3}
+
+def test_failure_is_reraised_and_stops_new_stages():
+    started = []
+    release = threading.Event()
+    def fail(inputs):
+        raise RuntimeError('extract failed')
+    def slow(inputs):
+        started.append('slow')
+        release.wait(5)
+        return 'done'
+    def after(inputs):
+        started.append('after')
+    stages = {
+        'fail': (fail, []),
+        'slow': (slow, []),
+        'after_fail': (after, ['fail']),
+        'after_slow': (after, ['slow']),
+    }
+    threading.Timer(0.2, release.set).start()
+    with pytest.raises(RuntimeError, match='extract failed'):
+        run_stages(stages, max_workers=2)
+    # the running stage was allowed to finish, but nothing new started
+    assert started == ['slow']
+
+def test_skip_remaining_returns_partial_results():
+    ran = []
+    def check(inputs):
+        raise SkipRemaining('no changes')
+    stages = {
+        'probe': (lambda inputs: 'probed', []),
+        'check': (check, ['probe']),
+        'load': (lambda inputs: ran.append('load'), ['check']),
+    }
+    assert run_stages(stages, max_workers=1) == {'probe': 'probed'}
+    assert ran == []
+
+def test_stage_order_rejects_unknown_dependencies_and_cycles():
+    with pytest.raises(ValueError, match='unknown'):
+        stage_order({'a': (None, ['missing'])})
+    with pytest.raises(ValueError, match='cycle'):
+        stage_order({'a': (None, ['b']), 'b': (None, ['a'])})
@@ -0,0 +1,25 @@
+import pandas as pd
+
+from etl_modules.dates import parse_dates, date_ids_from_dates
+
+def test_parse_dates_reads_each_format_to_midnight():
+    values = pd.Series(['2024-03-05', '3/5/2024', '2024-03-05 17:45:00', '', None, 'not a date'])
+    parsed = parse_dates(values)
+    assert list(date_ids_from_dates(parsed)[:3]) == [20240305, 20240305, 20240305]
+    assert parsed[3:].isna().all()
+
+def test_parse_dates_fills_cache_and_reuses_it():
+    cache = {}
+    parse_dates(pd.Series(['2024-01-02', '2024-01-02', 'garbage']), cache)
+    assert set(cache) == {'2024-01-02', 'garbage'}
+    assert pd.isna(cache['garbage'])
+
+    # A cached value wins over parsing, so a hit must not be parsed again
+    cache['2024-01-02'] = pd.Timestamp('1999-12-31')
+    parsed = parse_dates(pd.Series(['2024-01-02', '2024-01-03']), cache)
+    assert list(parsed) == [pd.Timestamp('1999-12-31'), pd.Timestamp('2024-01-03')]
+    assert '2024-01-03' in cache
+
+def test_parse_dates_keeps_index():
+    values = pd.Series(['2024-01-02', None], index=[10, 20])
+    assert list(parse_dates(values).index) == [10, 20]
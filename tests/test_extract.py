@@ -0,0 +1,51 @@
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine
+
+from etl_modules.extract import get_key_ranges, stream_order_items
+
+OLD, NEW = '2024-01-01 00:00:00', '2024-02-01 00:00:00'
+
+@pytest.fixture
+def source(tmp_path):
+    """A small source with orders of 1, 3 and 5 items and a gap in the order ids"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'source.db'}")
+    item_counts = {1: 1, 2: 3, 3: 5, 7: 3, 8: 1}
+    items = pd.DataFrame([
+        {'OrderId': order_id, 'ProductId': product_id, 'quantity': 1, 'notes': None,
+         'createdAt': OLD, 'updatedAt': NEW if order_id == 3 and product_id == 0 else OLD}
+        for order_id, count in item_counts.items() for product_id in range(count)
+    ])
+    orders = pd.DataFrame({
+        'id': list(item_counts), 'updatedAt': [NEW if order_id == 7 else OLD for order_id in item_counts],
+    })
+    items.to_sql('OrderItems', engine, index=False)
+    orders.to_sql('Orders', engine, index=False)
+    yield engine
+    engine.dispose()
+
+@pytest.mark.parametrize('chunksize', [1, 2, 4, 5, 100])
+def test_stream_order_items_never_splits_an_order(source, chunksize):
+    chunks = list(stream_order_items(source, chunksize=chunksize))
+    seen = [set(chunk['OrderId']) for chunk in chunks]
+    assert all(len(chunk) > 0 for chunk in chunks)
+    for i, orders in enumerate(seen):
+        assert not orders & set().union(*seen[:i])
+    combined = pd.concat(chunks, ignore_index=True)
+    assert combined.groupby('OrderId').size().to_dict() == {1: 1, 2: 3, 3: 5, 7: 3, 8: 1}
+
+def test_stream_order_items_since_reads_whole_touched_orders(source):
+    chunks = list(stream_order_items(source, chunksize=2, since=pd.Timestamp('2024-01-15', tz='UTC')))
+    combined = pd.concat(chunks, ignore_index=True)
+    # order 3 through one updated item, order 7 through the order row
+    assert combined.groupby('OrderId').size().to_dict() == {3: 5, 7: 3}
+
+def test_get_key_ranges_cover_the_key_span(source):
+    assert get_key_ranges(source, 'OrderItems', 3) == [(1, 3), (4, 6), (7, 8)]
+    assert get_key_ranges(source, 'OrderItems', 1) == [(1, 8)]
+    # never more ranges than keys in the span
+    assert get_key_ranges(source, 'OrderItems', 50) == [(key, key) for key in range(1, 9)]
+
+def test_get_key_ranges_since(source):
+    assert get_key_ranges(source, 'OrderItems', 2, since=pd.Timestamp('2024-01-15', tz='UTC')) == [(3, 5), (6, 7)]
+    assert get_key_ranges(source, 'OrderItems', 2, since=pd.Timestamp('2024-03-01', tz='UTC')) == []
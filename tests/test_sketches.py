@@ -0,0 +1,33 @@
+import numpy as np
+import pytest
+
+from etl_modules.sketches import HLL_ERROR, build_sketches, estimate_distinct, merge_sketches
+
+@pytest.mark.parametrize('n', [1, 100, 5000, 200000])
+def test_estimate_distinct_within_error(n):
+    values = np.arange(n, dtype=np.int64) * 7919
+    registers = build_sketches(np.zeros(n), values, 1)
+    # three standard errors; small sets are counted almost exactly
+    assert abs(estimate_distinct(registers)[0] - n) <= max(1, 3 * HLL_ERROR * n)
+
+def test_duplicates_do_not_count():
+    values = np.repeat(np.arange(1000, dtype=np.int64), 5)
+    once = build_sketches(np.zeros(1000), np.arange(1000), 1)
+    assert np.array_equal(build_sketches(np.zeros(len(values)), values, 1), once)
+
+def test_empty_sketch_estimates_zero():
+    assert list(estimate_distinct(build_sketches([], np.array([], dtype=np.int64), 2))) == [0, 0]
+
+def test_merge_equals_sketch_of_union():
+    rng = np.random.default_rng(0)
+    values = rng.integers(0, 50000, size=30000)
+    groups = rng.integers(0, 4, size=len(values))
+    per_group = build_sketches(groups, values, 4)
+
+    merged = merge_sketches([0, 1, 0, 1], per_group, 2)
+    expected = np.stack([
+        build_sketches(np.zeros(np.isin(groups, members).sum()), values[np.isin(groups, members)], 1)[0]
+        for members in ([0, 2], [1, 3])
+    ])
+    assert np.array_equal(merged, expected)
+    assert np.array_equal(merge_sketches(np.zeros(4), per_group, 1)[0], build_sketches(np.zeros(len(values)), values, 1)[0])
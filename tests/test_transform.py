@@ -0,0 +1,36 @@
+import pandas as pd
+
+from etl_modules.transform import FACT_KEY_SHIFT, fact_keys, transform_fact_table
+
+def test_fact_keys_pack_order_and_product():
+    keys = fact_keys(pd.Series([1, 7, 2**31 - 1]), pd.Series([5, 2**32 - 1, 3]))
+    assert list(keys) == [(1 << FACT_KEY_SHIFT) + 5, (7 << FACT_KEY_SHIFT) + 2**32 - 1, ((2**31 - 1) << FACT_KEY_SHIFT) + 3]
+    assert list(keys // (1 << FACT_KEY_SHIFT)) == [1, 7, 2**31 - 1]
+    assert list(keys % (1 << FACT_KEY_SHIFT)) == [5, 2**32 - 1, 3]
+
+def test_fact_keys_missing_product_is_zero():
+    keys = fact_keys(pd.Series([4, 4]), pd.Series([None, 9], dtype='Int64'))
+    assert list(keys) == [4 << FACT_KEY_SHIFT, (4 << FACT_KEY_SHIFT) + 9]
+
+def test_transform_fact_table_sums_repeated_order_lines():
+    updated = pd.Timestamp('2024-01-01 10:00:00')
+    order_items = pd.DataFrame({
+        'OrderId': [1, 1, 1, 2],
+        'ProductId': [10, 10, 11, 10],
+        'quantity': [2, 3, 1, 4],
+        'updatedAt': [updated, updated + pd.Timedelta(hours=1), updated, updated],
+    })
+    orders = pd.DataFrame({
+        'id': [1, 2], 'userId': [100, 200], 'deliveryRiderId': [7, None], 'updatedAt': [updated, updated],
+    })
+    products = pd.DataFrame({'id': [10, 11], 'price': [2.5, 4.0]})
+    delivery_dates = pd.Series(pd.to_datetime(['2024-01-03', '2024-01-04']))
+
+    facts = transform_fact_table(order_items, orders, products, delivery_dates).set_index('fact_id')
+
+    assert facts.index.is_unique
+    assert len(facts) == 3
+    line = facts.loc[(1 << FACT_KEY_SHIFT) + 10]
+    assert (line['quantity'], line['total_price']) == (5, 12.5)
+    assert line['updated_at'] == pd.Timestamp(updated + pd.Timedelta(hours=1), tz='UTC')
+    assert facts.loc[(2 << FACT_KEY_SHIFT) + 10, 'delivery_date_id'] == 20240104
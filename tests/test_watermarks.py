@@ -0,0 +1,39 @@
+import pandas as pd
+
+from etl_modules.watermarks import WATERMARK_LAG, apply_probe, changed_tables, observe_watermarks
+
+T0 = pd.Timestamp('2024-05-01 12:00:00', tz='UTC')
+
+def probe_of(row_count=3, max_id=3, max_updated_at=T0, probed_at=T0):
+    return {'Users': {'row_count': row_count, 'max_id': max_id, 'max_updated_at': max_updated_at, 'probed_at': probed_at}}
+
+def test_apply_probe_records_counts_and_settled_time():
+    watermarks = {'Users': {'max_updated_at': T0 - pd.Timedelta(days=1), 'max_id': 1}}
+    apply_probe(watermarks, probe_of(max_id=5))
+    assert watermarks['Users'] == {
+        'max_updated_at': T0 - pd.Timedelta(days=1), 'max_id': 5, 'row_count': 3,
+        'settled_before': T0 - WATERMARK_LAG,
+    }
+
+def test_apply_probe_new_table_and_no_probe_time():
+    watermarks = apply_probe({}, probe_of(probed_at=None))
+    assert watermarks['Users']['max_updated_at'] is None
+    assert watermarks['Users']['settled_before'] is None
+
+def test_observed_updates_are_held_back_by_the_lag():
+    watermarks = apply_probe({}, probe_of())
+    df = pd.DataFrame({'id': [1, 4], 'updatedAt': [T0 - pd.Timedelta(minutes=5), T0 - pd.Timedelta(seconds=1)]})
+    observe_watermarks(watermarks, 'Users', df)
+    assert watermarks['Users']['max_updated_at'] == T0 - WATERMARK_LAG
+    assert watermarks['Users']['max_id'] == 4
+
+    # a row updated inside the lag window is still seen as a change next run
+    assert changed_tables(probe_of(max_id=4), watermarks) == {'Users'}
+
+def test_settled_rows_are_not_changes():
+    watermarks = apply_probe({}, probe_of(max_updated_at=T0 - pd.Timedelta(minutes=5)))
+    df = pd.DataFrame({'id': [3], 'updatedAt': [T0 - pd.Timedelta(minutes=5)]})
+    observe_watermarks(watermarks, 'Users', df)
+    assert changed_tables(probe_of(max_updated_at=T0 - pd.Timedelta(minutes=5)), watermarks) == set()
+    assert changed_tables(probe_of(row_count=4), watermarks) == {'Users'}
+    assert changed_tables(probe_of(), {}) == {'Users'}